@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# ==============================================================================
+# PDF Header Tool — benchmark.py
+# Version : 0.4.6
+# Build   : build-2026.02.21.07
+# Repo    : MondeDesPossibles/pdf-header-tool
+# Usage   : python3 benchmark.py suite [--out res.json] [--scale 1.0] [--repeat 3] [--corpus DIR]
+#           python3 benchmark.py diff avant.json apres.json [--threshold 5]
+#           python3 benchmark.py modes [--pages 1000] [--files 3]
+# Dev-only : ne pas inclure dans la distribution finale.
+# ==============================================================================
+"""
+Benchmark du moteur d'en-tête de pdf_header.py.
+
+suite : corpus synthétique déterministe (graine fixe) généré avec fitz, puis mesure
+        de chaque famille de fichiers :
+          - tampon : _stamp_file() (chemin de _apply), ouverture, boucle des pages
+            et enregistrement mesurés séparément
+          - aperçu : rendu de la page 1 à l'échelle du canvas (_render_preview)
+          - texte  : _compose_header_text()
+        Chaque famille est mesurée --repeat fois, le meilleur passage est retenu, dans
+        un processus à part (pic de mémoire RSS propre à la famille).
+        Résultat JSON (stdout ou --out ; la progression va sur stderr) : pages/s,
+        ms/fichier, pic de mémoire, taille de sortie.
+diff  : compare deux résultats JSON de suite, métrique par métrique.
+modes : tracé par page vs tampon partagé (XObject) sur des PDFs texte.
+
+Les PDFs sont générés dans un dossier temporaire supprimé à la fin, ou dans
+--corpus (réutilisé tel quel d'un lancement à l'autre).
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Messages de PyMuPDF (ex. avertissement « fitz API is deprecated ») sur stderr :
+# stdout est réservé au JSON de suite. Hérité par les processus des familles.
+os.environ.setdefault("PYMUPDF_MESSAGE", "fd:2")
+
+import pdf_header as ph
+import fitz  # PyMuPDF
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+MODES = {
+    "per_page": False,
+    "shared":   True,
+}
+
+# Réglages représentatifs : toutes les options qui ajoutent du contenu par page
+BENCH_CONFIG = dict(
+    ph.DEFAULT_CONFIG,
+    use_prefix=True, prefix_text="CONFIDENTIEL",
+    use_date=True,
+    use_frame=True, use_bg=True, underline=True,
+)
+
+SEED          = 20260221
+RESULT_FORMAT = 2             # 2 : peak_rss_mb mesuré par famille (processus dédié)
+CANVAS_SIZE   = (800, 900)    # canvas d'aperçu simulé (px)
+HEADER_CALLS  = 20000         # appels de _compose_header_text() mesurés
+
+# Formats de page (pts) tirés pour la famille "mixed"
+PAGE_SIZES = [(595, 842), (842, 595), (420, 595), (612, 792), (612, 1008), (842, 1191)]
+
+# Familles du corpus : nb de fichiers, pages par fichier, contenu, formats.
+# Multipliés par --scale (minimum 1).
+CORPUS = {
+    "text_small": {"files": 20, "pages": 4,   "kind": "text",  "sizes": "a4"},
+    "text_large": {"files": 2,  "pages": 600, "kind": "text",  "sizes": "a4"},
+    "mixed":      {"files": 6,  "pages": 40,  "kind": "text",  "sizes": "mixed"},
+    "scanned":    {"files": 4,  "pages": 15,  "kind": "image", "sizes": "a4"},
+}
+
+# Métriques comparées par diff : +1 plus haut = mieux, -1 plus bas = mieux
+METRICS = {
+    "pages_per_s":    +1,
+    "ms_per_file":    -1,
+    "open_ms":        -1,
+    "stamp_ms":       -1,
+    "save_ms":        -1,
+    "render_ms":      -1,
+    "bytes_out":      -1,
+    "peak_rss_mb":    -1,
+}
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+def _make_doc(path: Path, n_pages: int) -> None:
+    """PDF texte de n_pages A4."""
+    doc = fitz.open()
+    for i in range(n_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((72, 100), f"Page {i + 1} — " + "lorem ipsum " * 8, fontsize=10)
+    doc.save(str(path), garbage=4, deflate=True)
+    doc.close()
+
+def _scan_image(rng: random.Random, w: int, h: int) -> bytes:
+    """JPEG niveaux de gris imitant une page numérisée : fond clair bruité, lignes sombres."""
+    rows = []
+    for y in range(h):
+        ink = (y // 12) % 3 == 0 and 40 < y < h - 40
+        rows.append(bytes(rng.randrange(20, 90) if ink and rng.random() < 0.4
+                          else rng.randrange(225, 256) for _ in range(w)))
+    pix = fitz.Pixmap(fitz.csGRAY, w, h, b"".join(rows), False)
+    return pix.tobytes("jpg")
+
+def _make_corpus_doc(path: Path, spec: dict, rng: random.Random) -> None:
+    doc = fitz.open()
+    # Quelques images par fichier, réutilisées de page en page comme un vrai lot de scans
+    images = [_scan_image(rng, 425, 600) for _ in range(3)] if spec["kind"] == "image" else []
+    for i in range(spec["pages"]):
+        w, h = rng.choice(PAGE_SIZES) if spec["sizes"] == "mixed" else (595, 842)
+        page = doc.new_page(width=w, height=h)
+        if images:
+            page.insert_image(page.rect, stream=images[i % len(images)])
+            continue
+        words = [rng.choice(("lorem", "ipsum", "dolor", "sit", "amet", "facture", "contrat"))
+                 for _ in range(int(h / 14) * 12)]
+        page.insert_textbox(fitz.Rect(40, 40, w - 40, h - 40),
+                            f"Page {i + 1} — " + " ".join(words), fontsize=9)
+    doc.save(str(path), garbage=4, deflate=True, no_new_id=True)
+    doc.close()
+
+def _scaled(n: int, scale: float) -> int:
+    return max(1, round(n * scale))
+
+def build_corpus(root: Path, scale: float) -> dict:
+    """Génère (ou reprend) le corpus sous root ; retourne {famille: [Path, ...]}.
+    Même graine et même scale → mêmes pages, d'une machine à l'autre."""
+    spec_file = root / "corpus.json"
+    wanted = {"seed": SEED, "scale": scale, "families": CORPUS}
+    reuse = spec_file.exists() and json.loads(spec_file.read_text()) == wanted
+    corpus = {}
+    for family, spec in CORPUS.items():
+        spec = dict(spec, files=_scaled(spec["files"], scale), pages=_scaled(spec["pages"], scale))
+        rng = random.Random(f"{SEED}-{family}")
+        folder = root / family
+        folder.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for n in range(spec["files"]):
+            path = folder / f"{family}_{n:03d}.pdf"
+            if not (reuse and path.exists()):
+                _make_corpus_doc(path, spec, rng)
+            paths.append(path)
+        corpus[family] = paths
+    spec_file.write_text(json.dumps(wanted))
+    return corpus
+
+# ---------------------------------------------------------------------------
+# Mesures
+# ---------------------------------------------------------------------------
+def _peak_rss_mb():
+    """Pic de mémoire résidente du process (Mo), None si indisponible (Windows)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1_048_576 if sys.platform == "darwin" else peak / 1024
+
+def bench_family(paths: list, out_dir: Path, cfg: dict) -> dict:
+    """Tampon + aperçu pour une famille de fichiers."""
+    totals = {"files": 0, "pages": 0, "bytes_in": 0, "bytes_out": 0,
+              "open_ms": 0.0, "stamp_ms": 0.0, "save_ms": 0.0, "render_ms": 0.0}
+    cw, ch = CANVAS_SIZE
+    for path in paths:
+        stats = ph._stamp_file(path, out_dir / path.name, cfg)
+        totals["files"]     += 1
+        totals["pages"]     += stats["pages"]
+        totals["bytes_in"]  += path.stat().st_size
+        totals["bytes_out"] += stats["bytes_out"]
+        for key in ("open_ms", "stamp_ms", "save_ms"):
+            totals[key] += stats[key]
+
+        # Aperçu : même échelle et même rendu que _render_preview() sur un canvas cw × ch
+        with fitz.open(str(path)) as doc:
+            page = doc[0]
+            scale = ph._quantize_scale(ph._preview_fit_scale(page.rect.width, page.rect.height, cw, ch))
+            t0 = time.perf_counter()
+            ph._render_page_image(page, scale)
+            totals["render_ms"] += (time.perf_counter() - t0) * 1000
+
+    busy_s = (totals["open_ms"] + totals["stamp_ms"] + totals["save_ms"]) / 1000
+    n = max(totals["files"], 1)
+    return dict(
+        totals,
+        pages_per_s=totals["pages"] / busy_s if busy_s else 0.0,
+        ms_per_file=busy_s * 1000 / n,
+        render_ms=totals["render_ms"] / n,
+    )
+
+def _bench_family_runs(paths: list, out_dir: Path, cfg: dict, repeat: int) -> dict:
+    """repeat passages de bench_family(), le meilleur est retenu. Exécuté dans un
+    processus neuf : ru_maxrss ne redescend jamais, le pic ne vaut que pour la famille."""
+    runs = [bench_family(paths, out_dir, cfg) for _ in range(max(1, repeat))]
+    return dict(min(runs, key=lambda run: run["ms_per_file"]), peak_rss_mb=_peak_rss_mb())
+
+def _bench_family_isolated(paths: list, out_dir: Path, cfg: dict, repeat: int) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(_bench_family_runs, paths, out_dir, cfg, repeat).result()
+
+def bench_header(path: Path, cfg: dict) -> float:
+    """Durée moyenne (µs) de _compose_header_text() avec métadonnées connues."""
+    meta = ph._read_file_meta(path)
+    t0 = time.perf_counter()
+    for _ in range(HEADER_CALLS):
+        ph._compose_header_text(cfg, path, meta)
+    return (time.perf_counter() - t0) / HEADER_CALLS * 1e6
+
+def run_suite(scale: float, repeat: int = 3, corpus_dir=None) -> dict:
+    with tempfile.TemporaryDirectory(prefix="pdf_header_bench_") as tmp:
+        corpus_root = Path(corpus_dir) if corpus_dir else Path(tmp) / "corpus"
+        t0 = time.perf_counter()
+        corpus = build_corpus(corpus_root, scale)
+        print(f"Corpus : {sum(map(len, corpus.values()))} fichier(s) en "
+              f"{time.perf_counter() - t0:.1f} s ({corpus_root})", file=sys.stderr)
+        families = {}
+        for family, paths in corpus.items():
+            r = families[family] = _bench_family_isolated(paths, Path(tmp) / "out" / family,
+                                                          BENCH_CONFIG, repeat)
+            print(f"  {family:<11} {r['files']:>4} fichier(s) {r['pages']:>6} page(s)  "
+                  f"{r['pages_per_s']:>8.1f} pages/s  {r['ms_per_file']:>8.1f} ms/fichier  "
+                  f"aperçu {r['render_ms']:>6.1f} ms", file=sys.stderr)
+        header_us = bench_header(corpus["text_small"][0], BENCH_CONFIG)
+        print(f"  texte d'en-tête : {header_us:.2f} µs/appel", file=sys.stderr)
+    return {
+        "format":    RESULT_FORMAT,
+        "version":   ph.VERSION,
+        "date":      time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python":    platform.python_version(),
+        "pymupdf":   fitz.VersionBind,
+        "platform":  platform.platform(),
+        "seed":      SEED,
+        "scale":     scale,
+        "repeat":    repeat,
+        "families":  families,
+        "header_us": header_us,
+        # Pic du processus principal : génération du corpus + texte d'en-tête
+        "suite_process_peak_rss_mb": _peak_rss_mb(),
+    }
+
+# ---------------------------------------------------------------------------
+# Comparaison de deux résultats
+# ---------------------------------------------------------------------------
+def diff_results(old: dict, new: dict, threshold: float) -> int:
+    """Affiche l'écart de chaque métrique ; retourne le nombre de régressions
+    au-delà de threshold (%)."""
+    if old.get("scale") != new.get("scale") or old.get("seed") != new.get("seed"):
+        print("Attention : corpus différents (seed / scale) — comparaison indicative.")
+    if old.get("format") != new.get("format"):
+        print(f"Attention : formats de résultat différents ({old.get('format')} / {new.get('format')}) "
+              f"— peak_rss_mb n'a pas le même sens.")
+    print(f"  avant : v{old.get('version')} {old.get('date')}  ·  après : v{new.get('version')} {new.get('date')}")
+    print(f"  {'famille':<11} {'métrique':<12} {'avant':>12} {'après':>12} {'écart':>9}")
+    regressions = 0
+    rows = [(family, metric, sign, old["families"][family].get(metric), r.get(metric))
+            for family, r in new["families"].items() if family in old["families"]
+            for metric, sign in METRICS.items()]
+    rows.append(("-", "header_us", -1, old.get("header_us"), new.get("header_us")))
+    for family, metric, sign, before, after in rows:
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change * sign < -threshold
+        regressions += worse
+        flag = "  ← régression" if worse else ""
+        print(f"  {family:<11} {metric:<12} {before:>12.2f} {after:>12.2f} {change:>+8.1f}%{flag}")
+    print(f"{regressions} régression(s) au-delà de {threshold:g} %")
+    return regressions
+
+# ---------------------------------------------------------------------------
+# Tracé par page vs tampon partagé
+# ---------------------------------------------------------------------------
+def bench_modes(n_files: int, n_pages: int) -> dict:
+    """Retourne {mode: {"seconds", "pages", "bytes"}}."""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pdf_header_bench_") as tmp:
+        src_dir = Path(tmp) / "src"
+        src_dir.mkdir()
+        sources = []
+        for n in range(n_files):
+            path = src_dir / f"doc_{n:03d}.pdf"
+            _make_doc(path, n_pages)
+            sources.append(path)
+
+        for mode, shared in MODES.items():
+            cfg = dict(BENCH_CONFIG, shared_stamp=shared)
+            out_dir = Path(tmp) / mode
+            pages = 0
+            t0 = time.perf_counter()
+            for path in sources:
+                pages += ph._stamp_file(path, out_dir / path.name, cfg)["pages"]
+            seconds = time.perf_counter() - t0
+            size = sum(p.stat().st_size for p in out_dir.glob("*.pdf"))
+            results[mode] = {"seconds": seconds, "pages": pages, "bytes": size}
+    return results
+
+def print_modes(n_files: int, n_pages: int):
+    print(f"Benchmark : {n_files} fichier(s) × {n_pages} page(s)")
+    results = bench_modes(n_files, n_pages)
+    ref = results["per_page"]
+    print(f"  {'mode':<10} {'temps (s)':>10} {'pages/s':>10} {'sortie (Ko)':>12} {'vs per_page':>12}")
+    for mode, r in results.items():
+        ratio = r["seconds"] / ref["seconds"] if ref["seconds"] else 0.0
+        print(f"  {mode:<10} {r['seconds']:>10.2f} {r['pages'] / r['seconds']:>10.1f} "
+              f"{r['bytes'] / 1024:>12.1f} {ratio:>11.2f}×")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur d'en-tête")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_suite = sub.add_parser("suite", help="corpus synthétique complet, résultat JSON")
+    p_suite.add_argument("--out", metavar="FICHIER", help="écrit le résultat JSON (défaut : stdout)")
+    p_suite.add_argument("--scale", type=float, default=1.0,
+                         help="facteur sur le nombre de fichiers et de pages (défaut 1.0)")
+    p_suite.add_argument("--repeat", type=int, default=3,
+                         help="passages par famille, le meilleur est retenu (défaut 3)")
+    p_suite.add_argument("--corpus", metavar="DOSSIER",
+                         help="dossier du corpus, conservé et réutilisé (défaut : temporaire)")
+
+    p_diff = sub.add_parser("diff", help="compare deux résultats JSON de suite")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    p_diff.add_argument("--threshold", type=float, default=5.0,
+                        help="écart signalé comme régression, en %% (défaut 5)")
+
+    p_modes = sub.add_parser("modes", help="tracé par page vs tampon partagé")
+    p_modes.add_argument("--pages", type=int, default=1000, help="pages par fichier (défaut 1000)")
+    p_modes.add_argument("--files", type=int, default=3, help="nombre de fichiers (défaut 3)")
+    args = parser.parse_args()
+
+    if args.command == "suite":
+        result = run_suite(args.scale, args.repeat, args.corpus)
+        blob = json.dumps(result, indent=2)
+        if args.out:
+            Path(args.out).write_text(blob, encoding="utf-8")
+            print(f"Résultat : {args.out}", file=sys.stderr)
+        else:
+            print(blob)
+    elif args.command == "diff":
+        old = json.loads(Path(args.old).read_text(encoding="utf-8"))
+        new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+        sys.exit(1 if diff_results(old, new, args.threshold) else 0)
+    else:
+        print_modes(args.files, args.pages)
+
+if __name__ == "__main__":
+    main()
@@ -18,11 +18,36 @@ import json
 import shutil
 import tempfile
 import threading
+import queue
+import atexit
+import signal
 import datetime
+import time
+import argparse
+import contextlib
+import functools
+import hashlib
+import multiprocessing
+import math
+import struct
+import importlib
+import importlib.util
+from collections import Counter, OrderedDict, deque
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 import urllib.request
 import urllib.error
 from pathlib import Path
 
+_T_START         = time.perf_counter()  # origine des mesures --startup-profile
+_STARTUP_PROFILE = False                # activé par --startup-profile (main)
+
+def _startup_log(phase: str, t0: float):
+    """--startup-profile : durée d'une phase du démarrage et temps écoulé depuis le lancement."""
+    if _STARTUP_PROFILE:
+        now = time.perf_counter()
+        print(f"[startup] {phase:<24} {(now - t0) * 1000:8.1f} ms  (t+{(now - _T_START) * 1000:.0f} ms)")
+
 # ---------------------------------------------------------------------------
 # Bootstrap : modèle portable (Étape 4.6+)
 # ---------------------------------------------------------------------------
@@ -96,39 +121,71 @@ def _apply_pending_update():
         print(f"[{_ts()}] UPDATE_APPLY ERREUR: {e}")
 
 def _bootstrap():
-    """Vérifie que les dépendances sont disponibles.
+    """Vérifie que les dépendances sont disponibles, sans les importer
+    (l'import réel est différé au premier usage, voir _LazyModule).
     Sur Windows : installées dans site-packages/ par setup.bat (lancer.bat).
     Sur Linux   : installées manuellement via pip install pymupdf Pillow customtkinter
     """
-    try:
-        import fitz          # noqa: F401
-        import customtkinter # noqa: F401
-        from PIL import Image # noqa: F401
-    except ImportError as e:
-        print(f"Dépendance manquante : {e}")
+    missing = [name for name in ("fitz", "customtkinter", "PIL")
+               if importlib.util.find_spec(name) is None]
+    if missing:
+        print(f"Dépendance manquante : {', '.join(missing)}")
         if sys.platform == "win32":
             print("Lancez lancer.bat pour installer les dépendances automatiquement.")
         else:
             print("Installez les dépendances : pip install pymupdf Pillow customtkinter")
         sys.exit(1)
 
-_apply_pending_update()
+# Processus worker du pool (méthode spawn : le script est réimporté sous "__mp_main__")
+# → ne jamais appliquer de patch ni redémarrer depuis un worker.
+if __name__ != "__mp_main__":
+    _apply_pending_update()
 _bootstrap()
 
 # ---------------------------------------------------------------------------
 # Imports (disponibles après bootstrap)
 # ---------------------------------------------------------------------------
+class _LazyModule:
+    """Module importé au premier accès à un de ses attributs.
+    PyMuPDF (~180 ms) et CustomTkinter ne sont plus chargés au lancement :
+    le mode batch n'importe jamais l'interface, et la fenêtre s'affiche
+    avant que PyMuPDF ne soit chargé (thread de chargement / _warm_imports).
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, name: str):
+        self._name = name
+        self._mod  = None
+
+    def _load(self):
+        if self._mod is None:
+            with _LazyModule._lock:
+                if self._mod is None:
+                    t0 = time.perf_counter()
+                    self._mod = importlib.import_module(self._name)
+                    _startup_log(f"import {self._name}", t0)
+        return self._mod
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser
-import customtkinter as ctk
-from PIL import Image, ImageTk
-import fitz  # PyMuPDF
+ctk     = _LazyModule("customtkinter")
+Image   = _LazyModule("PIL.Image")
+ImageTk = _LazyModule("PIL.ImageTk")
+fitz    = _LazyModule("fitz")  # PyMuPDF
+
+def _warm_imports():
+    """Charge PyMuPDF et Pillow hors du thread Tk, pendant que l'utilisateur choisit ses fichiers."""
+    fitz.open, Image.frombytes, ImageTk.PhotoImage
 
 # ---------------------------------------------------------------------------
 # Chemins et config
 # ---------------------------------------------------------------------------
 INSTALL_DIR = _get_install_dir()
 CONFIG_FILE = INSTALL_DIR / "pdf_header_config.json"
+FONT_INDEX_FILE = INSTALL_DIR / "pdf_header_fonts.json"
 
 # ---------------------------------------------------------------------------
 # Constantes UI — couleurs, dimensions, timings
@@ -193,6 +250,8 @@ SIZES = {
     # Canvas — calcul d'échelle
     "canvas_pad":        40,     # marge autour de la page (px)
     "canvas_scale_max":  2.5,    # échelle max de prévisualisation
+    "preview_scale_step": 0.03,  # pas relatif entre deux échelles de rendu (quantification)
+    "preview_cache_mb":  192,    # mémoire max des aperçus rendus gardés en cache
     # Overlay — approximations texte
     "cross_radius":      5,      # rayon de la croix de positionnement (px)
     "text_char_w":       0.65,   # largeur approx. d'un caractère (× font_size)
@@ -219,11 +278,17 @@ SIZES = {
     "entry_margin_w":    55,     # champs marges / espacement
     "entry_frame_w":     50,     # champs cadre (largeur, padding)
     "menu_font_w":       155,    # menu sélection police
+    "font_menu_max":     40,     # entrées du menu police (non défilable) ; au-delà : recherche
     "menu_opt_w":        110,    # menus options standard
     "menu_date_fmt_w":   185,    # menu format de date
     # Wrapping texte
     "preview_wrap":      230,    # aperçu texte (sidebar)
-    "card_wrap":         180,    # nom fichier dans les cartes
+    # Cartes du panneau fichiers (liste virtualisée, hauteur fixe)
+    "card_h":            52,     # hauteur d'une carte
+    "card_gap":          6,      # espace vertical entre deux cartes
+    "card_name_chars":   26,     # nom tronqué au-delà (…)
+    "card_wheel_rows":   3,      # cartes défilées par cran de molette
+    "scan_batch":        500,    # PDFs trouvés envoyés au panneau par lot
     # Tailles de polices UI
     "font_hint":         8,      # texte hint / coordonnées
     "font_date_fmt":     9,      # menu format de date
@@ -240,11 +305,26 @@ SIZES = {
     "frame_pad_min":     0.0,
     "pos_ratio_min":     0.01,
     "pos_ratio_max":     0.99,
+    # Log debug
+    "debug_log_max_mb":  5,      # rotation au-delà (pdf_header_debug.log → .1, .2…)
+    "debug_log_backups": 3,      # anciens logs conservés
 }
 
 TIMINGS = {
     "update_version_timeout":  5,    # vérification version (s)
     "update_download_timeout": 15,   # téléchargement mise à jour (s)
+    "progress_interval_ms":    50,   # intervalle mini entre deux rafraîchissements de progression
+    "progress_poll_ms":        200,  # sondage de la taille du fichier pendant l'enregistrement
+    "resize_debounce_ms":      150,  # délai sans <Configure> avant le vrai rendu MuPDF
+    "mupdf_retry_ms":          40,   # rendu repoussé quand un chargement occupe MuPDF
+    "overlay_frame_ms":        16,   # au plus un redessin de l'overlay par image (~60 Hz)
+    "overlay_stats_s":         5,    # période du temps moyen de l'overlay dans le log debug
+    "scan_flush_ms":           250,  # envoi au panneau des PDFs trouvés par le scan, au plus tard
+    "manifest_flush_ms":       2000, # écriture différée des manifestes de sortie
+    "log_flush_ms":            500,  # regroupement des lignes du log debug avant écriture
+    "config_save_ms":          1000, # écriture différée de la config (rafale d'Appliquer)
+    "watch_poll_ms":           1000, # --watch : intervalle entre deux relevés du dossier
+    "watch_stable_s":          2,    # --watch : taille et date inchangées depuis (fichier complet)
 }
 
 DEFAULT_CONFIG = {
@@ -292,14 +372,21 @@ DEFAULT_CONFIG = {
     "bg_opacity"     : 0.8,
     # Application
     "all_pages"      : True,
+    "shared_stamp"   : False,        # en-tête tracé une fois (XObject) puis posé sur chaque page
+    "save_profile"   : "compact",    # "fast" | "incremental" | "compact" | "web" (SAVE_PROFILES)
+    "batch_workers"  : 0,            # processus pour "Appliquer à tous" / batch (0 = nb de cœurs)
+    "scan_recursive" : False,        # ouverture de dossier : inclure les sous-dossiers
+    "info_workers"   : 2,            # ouvertures simultanées max pour les infos des cartes
+    "dedup_inputs"   : True,         # sources identiques : une seule tamponnée, sortie liée aux autres
     "ui_font_size"   : 12,
     "debug_enabled"  : False,
 }
 
-def load_config():
-    if CONFIG_FILE.exists():
+def load_config(path=None):
+    config_file = Path(path) if path else CONFIG_FILE
+    if config_file.exists():
         try:
-            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+            with open(config_file, "r", encoding="utf-8") as f:
                 cfg = json.load(f)
             for k, v in DEFAULT_CONFIG.items():
                 cfg.setdefault(k, v)
@@ -320,17 +407,61 @@ def load_config():
                     cfg["custom_text"] = old_cst
                 cfg.setdefault("use_filename", old_mode != "custom")
             return cfg
-        except Exception:
-            pass
+        except Exception as e:
+            print(f"Config illisible ({config_file.name}: {e}) — valeurs par défaut")
     return DEFAULT_CONFIG.copy()
 
+class _ConfigStore:
+    """Persistance de la config : save() mémorise un instantané sérialisé et arme un
+    timer (TIMINGS["config_save_ms"]) ; une rafale d'Appliquer donne une seule écriture.
+    flush() écrit tout de suite — timer, et atexit pour ne rien perdre à la fermeture.
+    Écriture atomique (fichier temporaire + os.replace) : un arrêt brutal laisse
+    l'ancienne config ou la nouvelle, jamais un fichier tronqué.
+    """
+
+    def __init__(self, path: Path):
+        self.path     = path
+        self._pending = None     # JSON à écrire (None = rien en attente)
+        self._timer   = None
+        self._lock    = threading.Lock()
+        self._atexit  = False
+
+    def save(self, cfg: dict):
+        blob = json.dumps(cfg, indent=2, ensure_ascii=False)
+        with self._lock:
+            self._pending = blob
+            if not self._atexit:
+                atexit.register(self.flush)
+                self._atexit = True
+            if self._timer is None:
+                self._timer = threading.Timer(TIMINGS["config_save_ms"] / 1000, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            blob, self._pending = self._pending, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if blob is None:
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(blob)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+_CONFIG_STORE = _ConfigStore(CONFIG_FILE)
+
 def save_config(cfg):
-    try:
-        INSTALL_DIR.mkdir(parents=True, exist_ok=True)
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(cfg, f, indent=2, ensure_ascii=False)
-    except Exception:
-        pass
+    """Enregistre cfg (écriture différée et atomique, voir _ConfigStore)."""
+    _CONFIG_STORE.save(cfg)
 
 # ---------------------------------------------------------------------------
 # Logging debug (contrôlé par config "debug_enabled")
@@ -338,21 +469,214 @@ def save_config(cfg):
 _DEBUG_ENABLED = False
 _DEBUG_LOG     = INSTALL_DIR / "pdf_header_debug.log"
 
+class _BufferedLog:
+    """Écriture du log debug par un thread dédié, alimenté par une file.
+    Les lignes arrivées pendant TIMINGS["log_flush_ms"] sont écrites d'un bloc (une
+    ouverture du fichier par lot, pas par ligne) ; flush() à la sortie (atexit).
+    Les workers du pool (voir _init_pool_worker) ont chacun leur writer et ajoutent
+    leurs lots au même fichier. Rotation au-delà de SIZES["debug_log_max_mb"], par le
+    process principal seulement (une seule rotation à la fois) : après ses propres
+    écritures, et via check_size() à chaque résultat reçu du pool. Un lot qu'un worker
+    écrit pendant la rotation finit dans le fichier renommé (POSIX) ; sous Windows,
+    os.replace échoue tant qu'un worker tient le fichier ouvert et la rotation est
+    retentée au contrôle suivant.
+    """
+
+    _CHECK = object()   # marqueur de file : contrôle de taille seul
+
+    def __init__(self, path: Path):
+        self.path    = path
+        self._queue  = queue.Queue()
+        self._thread = None
+        self._lock   = threading.Lock()
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def write(self, line: str):
+        self._start()
+        self._queue.put(line)
+
+    def check_size(self):
+        """Demande un contrôle de taille (rotation) au thread d'écriture, sans rien
+        écrire : le fichier a pu grossir par les seules écritures des workers."""
+        if multiprocessing.parent_process() is None:
+            self._start()
+            self._queue.put(_BufferedLog._CHECK)
+
+    def flush(self, timeout: float = 2.0):
+        """Attend que les lignes déjà reçues soient sur disque."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TIMINGS["log_flush_ms"] / 1000
+            while isinstance(batch[-1], str):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            lines = [item for item in batch if isinstance(item, str)]
+            if lines:
+                self._write("".join(lines))
+            elif _BufferedLog._CHECK in batch:
+                self._check_rotate()
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    def _write(self, text: str):
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(text)
+        except Exception:
+            return
+        self._check_rotate()
+
+    def _check_rotate(self):
+        if multiprocessing.parent_process() is not None:
+            return
+        try:
+            if self.path.stat().st_size > SIZES["debug_log_max_mb"] * 1_048_576:
+                self._rotate()
+        except Exception:
+            pass
+
+    def _rotate(self):
+        """pdf_header_debug.log → .1 → .2 … ; le plus ancien est supprimé."""
+        backups = SIZES["debug_log_backups"]
+        for n in range(backups, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{n - 1}") if n > 1 else self.path
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{n}"))
+
+_DEBUG_WRITER = _BufferedLog(_DEBUG_LOG)
+
 def _debug_log(msg: str):
     if not _DEBUG_ENABLED:
         return
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    _DEBUG_WRITER.write(f"[{ts}] {msg}\n")
+
+def _init_pool_worker(debug_enabled: bool):
+    """Initialiseur des ProcessPoolExecutor : un worker spawn réimporte le module avec
+    _DEBUG_ENABLED = False, l'état du process principal lui est transmis ici.
+    PyMuPDF est chargé ici (~150–250 ms), avant le premier fichier : sinon l'import
+    est compté dans l'open_ms / le span stamp.open du premier fichier de chaque worker.
+    SIGINT ignoré : Ctrl+C dans un terminal atteint tout le groupe de processus, seul le
+    process principal décide de l'arrêt et laisse finir les fichiers en cours."""
+    global _DEBUG_ENABLED
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _DEBUG_ENABLED = debug_enabled
+    fitz.open
+
+# ---------------------------------------------------------------------------
+# Spans de temps — durées des chemins chauds, agrégées pour la session
+# (histogramme logarithmique : mémoire fixe, percentiles à ~12 % près)
+# ---------------------------------------------------------------------------
+_SPAN_BINS_PER_DECADE = 20
+
+class _SpanStats:
+    """Histogramme des durées d'un span : count, total, max et cases log10."""
+    __slots__ = ("count", "total", "max", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max   = 0.0
+        self.bins  = {}     # case → nb de mesures ; case k couvre [10^(k/N), 10^((k+1)/N)) s
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        k = math.floor(math.log10(max(seconds, 1e-7)) * _SPAN_BINS_PER_DECADE)
+        self.bins[k] = self.bins.get(k, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        """Borne haute de la case qui contient le q-ième percentile (plafonnée à max)."""
+        rank, seen = q / 100 * self.count, 0
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen >= rank:
+                return min(10 ** ((k + 1) / _SPAN_BINS_PER_DECADE), self.max)
+        return self.max
+
+class _Spans:
+    """Registre des spans de la session (thread-safe)."""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock  = threading.Lock()
+        self.started = datetime.datetime.now()
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = _SpanStats()
+            stats.add(seconds)
+
+    def summary(self) -> dict:
+        """{span: {"count", "total_ms", "p50_ms", "p95_ms", "max_ms"}}."""
+        with self._lock:
+            return {name: {
+                "count":    st.count,
+                "total_ms": round(st.total * 1000, 3),
+                "p50_ms":   round(st.percentile(50) * 1000, 3),
+                "p95_ms":   round(st.percentile(95) * 1000, 3),
+                "max_ms":   round(st.max * 1000, 3),
+            } for name, st in sorted(self._stats.items())}
+
+    def export(self, path):
+        """Écrit le résumé de la session en JSON."""
+        data = {
+            "version": VERSION,
+            "started": self.started.strftime("%Y-%m-%d %H:%M:%S"),
+            "ended":   datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "spans":   self.summary(),
+        }
+        Path(path).write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+_SPANS = _Spans()
+
+@contextlib.contextmanager
+def _span(name: str):
+    """Mesure la durée du bloc sous le nom name — `with _span("render"):`
+    ou `@_span("render")` sur une fonction."""
+    t0 = time.perf_counter()
     try:
-        with open(_DEBUG_LOG, "a", encoding="utf-8") as f:
-            f.write(f"[{ts}] {msg}\n")
-    except Exception:
-        pass
+        yield
+    finally:
+        _SPANS.add(name, time.perf_counter() - t0)
+
+def _record_stamp_spans(stats):
+    """Spans d'un _stamp_file() — repris de ses mesures, y compris quand il a tourné
+    dans un processus du pool."""
+    if stats and not stats.get("linked"):
+        _SPANS.add("stamp.open",  stats["open_ms"] / 1000)
+        _SPANS.add("stamp.pages", stats["stamp_ms"] / 1000)
+        _SPANS.add("stamp.save",  stats["save_ms"] / 1000)
 
 # ---------------------------------------------------------------------------
 # Mise à jour automatique (depuis v0.4.6.1)
 # Stratégie : GitHub Releases API + metadata.json + app-patch.zip
 # Le patch est téléchargé dans _update_pending/ et appliqué au prochain démarrage.
 # ---------------------------------------------------------------------------
+@_span("update_check")
 def _check_update_thread():
     import datetime
     def _ts():
@@ -541,6 +865,23 @@ DATE_SOURCE_DISPLAY = {
 }
 DATE_SOURCE_INTERNAL = {v: k for k, v in DATE_SOURCE_DISPLAY.items()}
 
+# Profils d'enregistrement → options de Document.save()
+# "fast" = options par défaut de doc.save(), voulu : le profil nomme le choix
+# explicite « sans nettoyage » face au défaut de l'outil ("compact").
+SAVE_PROFILES = {
+    "fast":        {"garbage": 0},                                    # pas de nettoyage
+    "incremental": {"incremental": True},                             # ajout en fin d'une copie de la source
+    "compact":     {"garbage": 4, "deflate": True, "use_objstms": 1}, # réécriture complète, object streams
+    "web":         {"garbage": 3, "deflate": True, "linear": True},   # linéarisé (affichage progressif)
+}
+SAVE_PROFILE_DISPLAY = {
+    "fast":        "Rapide",
+    "incremental": "Incrémental",
+    "compact":     "Compact",
+    "web":         "Web (linéarisé)",
+}
+SAVE_PROFILE_INTERNAL = {v: k for k, v in SAVE_PROFILE_DISPLAY.items()}
+
 # Fonctionnalités masquées dans l'UI pour la v0.4.x (logique conservée)
 _HIDDEN_UI_FEATURES = {
     "letter_spacing",
@@ -575,36 +916,280 @@ def _get_font_dirs() -> list:
             Path.home() / ".local" / "share" / "fonts",
         ]
 
-def _find_priority_fonts() -> dict:
-    """
-    Cherche les polices prioritaires connues sur le système.
-    Retourne {display_name: Path}. Pas de scan exhaustif.
-    """
-    platform_key = sys.platform if sys.platform in PRIORITY_FONTS else "linux"
-    candidates   = PRIORITY_FONTS[platform_key]
-    font_dirs    = _get_font_dirs()
-    found        = {}
-    extensions   = (".ttf", ".otf", ".TTF", ".OTF")
-    for display_name, filename_stem in candidates:
-        for font_dir in font_dirs:
-            if not font_dir.exists():
+# ---------------------------------------------------------------------------
+# Index des polices système — pdf_header_fonts.json
+# Un enregistrement par dossier : mtime, sous-dossiers, faces (famille, style,
+# métriques). Un dossier dont le mtime n'a pas bougé n'est pas relu ; dans un
+# dossier modifié, seuls les fichiers nouveaux ou changés (taille, mtime) sont lus.
+# ---------------------------------------------------------------------------
+_FONT_INDEX_VERSION = 2        # 2 : faces des collections (.ttc / .otc), clé "index"
+_FONT_EXTENSIONS    = (".ttf", ".otf", ".ttc", ".otc")
+_FONT_COLLECTIONS   = (".ttc", ".otc")
+_SFNT_VERSIONS      = (b"\x00\x01\x00\x00", b"OTTO", b"true")
+_FONT_STD_STYLES    = {"regular", "book", "normal", "roman", "bold", "italic", "oblique",
+                       "bold italic", "bold oblique"}
+
+def _sfnt_tables(f, offset: int):
+    """Répertoire des tables de la police sfnt commençant à offset dans f :
+    (version, {tag: (offset, longueur, checksum)}), ou None si ce n'en est pas une."""
+    f.seek(offset)
+    header = f.read(12)
+    if len(header) < 12 or header[:4] not in _SFNT_VERSIONS:
+        return None
+    n_tables = struct.unpack(">H", header[4:6])[0]
+    records = f.read(16 * n_tables)
+    tables = {}
+    for i in range(n_tables):
+        tag, checksum, table_offset, length = struct.unpack(">4sIII", records[16 * i:16 * i + 16])
+        tables[tag] = (table_offset, length, checksum)
+    return header[:4], tables
+
+def _collection_offsets(f) -> list:
+    """Offsets des polices d'une collection (en-tête ttcf), [0] pour une police seule."""
+    f.seek(0)
+    if f.read(4) != b"ttcf":
+        return [0]
+    f.seek(8)
+    n_fonts = struct.unpack(">I", f.read(4))[0]
+    return list(struct.unpack(f">{n_fonts}I", f.read(4 * n_fonts)))
+
+def _read_sfnt_face(f, offset: int):
+    """Famille, style et métriques de la police sfnt à offset, lus dans les tables
+    name, head et hhea. None si illisible."""
+    try:
+        directory = _sfnt_tables(f, offset)
+        if directory is None:
+            return None
+        tables = directory[1]
+
+        def _table(tag):
+            table_offset, length, _ = tables[tag]
+            f.seek(table_offset)
+            return f.read(length)
+
+        name, head, hhea = _table(b"name"), _table(b"head"), _table(b"hhea")
+        # nameID 16/17 (typographique) sinon 1/2 ; Windows anglais > Windows > Mac
+        names = {}
+        _, count, str_offset = struct.unpack(">HHH", name[:6])
+        for i in range(count):
+            pid, _, lid, nid, length, str_pos = struct.unpack(">6H", name[6 + 12 * i:18 + 12 * i])
+            if nid not in (1, 2, 16, 17):
                 continue
-            for ext in extensions:
-                candidate = font_dir / (filename_stem + ext)
-                if candidate.exists():
-                    found[display_name] = candidate
-                    break
-            if display_name in found:
-                break
-    return found
+            raw = name[str_offset + str_pos:str_offset + str_pos + length]
+            if pid == 3:
+                rank, text = (0 if lid == 0x409 else 1), raw.decode("utf-16-be", "replace")
+            elif pid == 1 and lid == 0:
+                rank, text = 2, raw.decode("mac_roman", "replace")
+            else:
+                continue
+            if nid not in names or rank < names[nid][0]:
+                names[nid] = (rank, text.strip())
+        units_per_em = struct.unpack(">H", head[18:20])[0] or 1000
+        mac_style    = struct.unpack(">H", head[44:46])[0]
+        ascender, descender = struct.unpack(">hh", hhea[4:8])
+    except (OSError, KeyError, struct.error):
+        return None
+    family = (names.get(16) or names.get(1) or (0, ""))[1]
+    if not family:
+        return None
+    return {
+        "family":    family,
+        "style":     (names.get(17) or names.get(2) or (0, "Regular"))[1],
+        "bold":      bool(mac_style & 1),
+        "italic":    bool(mac_style & 2),
+        "ascender":  round(ascender / units_per_em, 4),
+        "descender": round(descender / units_per_em, 4),
+    }
+
+def _read_font_faces(path: str) -> list:
+    """Faces d'un fichier TrueType/OpenType (sans MuPDF : pas de verrou, pas de
+    chargement des glyphes). Une collection (.ttc / .otc) donne une face par police,
+    avec son "index" dans la collection ; [] pour un fichier illisible."""
+    faces = []
+    try:
+        with open(path, "rb") as f:
+            for index, offset in enumerate(_collection_offsets(f)):
+                face = _read_sfnt_face(f, offset)
+                if face is not None:
+                    face["index"] = index
+                    faces.append(face)
+    except (OSError, struct.error):
+        return []
+    return faces
+
+def _index_font_dir(dir_path: str, mtime: float, old=None) -> dict:
+    """Relit un dossier de polices. Les faces de l'ancien enregistrement sont reprises
+    telles quelles quand le fichier n'a changé ni de taille ni de mtime."""
+    known = {}
+    for face in (old or {}).get("faces", []):
+        known.setdefault(face["file"], []).append(face)
+    subdirs, faces = [], []
+    try:
+        entries = sorted(os.scandir(dir_path), key=lambda e: e.name)
+    except OSError:
+        entries = []
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                subdirs.append(entry.name)
+                continue
+            if not entry.name.lower().endswith(_FONT_EXTENSIONS):
+                continue
+            st = entry.stat()
+        except OSError:
+            continue
+        file_faces = known.get(entry.name)
+        if not file_faces or file_faces[0]["size"] != st.st_size or \
+                file_faces[0]["mtime"] != st.st_mtime:
+            file_faces = _read_font_faces(entry.path)
+            for face in file_faces:
+                face.update(file=entry.name, size=st.st_size, mtime=st.st_mtime)
+        faces.extend(file_faces)
+    return {"mtime": mtime, "subdirs": subdirs, "faces": faces}
+
+def _load_font_index() -> dict:
+    """Enregistrements {dossier: {...}} de pdf_header_fonts.json ({} si absent ou obsolète)."""
+    try:
+        data = json.loads(FONT_INDEX_FILE.read_text(encoding="utf-8"))
+        if data.get("version") == _FONT_INDEX_VERSION:
+            return data["dirs"]
+    except Exception:
+        pass
+    return {}
+
+def _refresh_font_index(old_dirs: dict):
+    """Parcourt les dossiers de polices et relit ceux dont le mtime a changé.
+    Retourne (dirs, changed) ; l'index est réécrit sur disque si changed."""
+    dirs, changed = {}, False
+    stack = [str(d) for d in reversed(_get_font_dirs())]
+    while stack:
+        dir_path = stack.pop()
+        if dir_path in dirs:
+            continue
+        try:
+            mtime = os.stat(dir_path).st_mtime
+        except OSError:
+            continue
+        entry = old_dirs.get(dir_path)
+        if entry is None or entry["mtime"] != mtime:
+            entry = _index_font_dir(dir_path, mtime, entry)
+            changed = True
+        dirs[dir_path] = entry
+        stack.extend(os.path.join(dir_path, sub) for sub in reversed(entry["subdirs"]))
+    changed = changed or dirs.keys() != old_dirs.keys()
+    if changed:
+        tmp = FONT_INDEX_FILE.with_name(FONT_INDEX_FILE.name + ".tmp")
+        try:
+            tmp.write_text(json.dumps({"version": _FONT_INDEX_VERSION, "dirs": dirs}),
+                           encoding="utf-8")
+            os.replace(tmp, FONT_INDEX_FILE)
+        except OSError as e:
+            _debug_log(f"FONTS index non enregistré : {e}")
+    return dirs, changed
+
+def _font_families_from_index(dirs: dict) -> dict:
+    """{famille: {(gras, italique): référence}} — chemin du fichier, ou "chemin#index"
+    pour une face de collection (_split_font_ref). Pour une même variante, un style
+    standard (Regular, Bold…) l'emporte sur Light, Condensed, etc."""
+    families, ranks = {}, {}
+    for dir_path, entry in dirs.items():
+        for face in entry["faces"]:
+            key  = (face["bold"], face["italic"])
+            rank = 0 if face["style"].lower() in _FONT_STD_STYLES else 1
+            variants = families.setdefault(face["family"], {})
+            if key not in variants or rank < ranks[face["family"], key]:
+                ref = os.path.join(dir_path, face["file"])
+                if ref.lower().endswith(_FONT_COLLECTIONS):
+                    ref = f"{ref}#{face['index']}"
+                variants[key] = ref
+                ranks[face["family"], key] = rank
+    return families
+
+_FONT_FAMILIES = None   # _font_families_from_index() de ce process (chargé au premier besoin)
+
+def _font_families() -> dict:
+    global _FONT_FAMILIES
+    if _FONT_FAMILIES is None:
+        _FONT_FAMILIES = _font_families_from_index(_load_font_index())
+    return _FONT_FAMILIES
+
+def _system_font_menu(families: dict) -> dict:
+    """{famille: fichier regular} pour le menu : polices prioritaires de la plateforme
+    d'abord, puis les autres familles par ordre alphabétique."""
+    platform_key = sys.platform if sys.platform in PRIORITY_FONTS else "linux"
+    priority = [name for name, _ in PRIORITY_FONTS[platform_key] if name in families]
+    menu = {}
+    for family in priority + sorted(set(families) - set(priority), key=str.lower):
+        if family in BUILTIN_FONTS:
+            continue
+        variants = families[family]
+        menu[family] = Path(variants.get((False, False)) or next(iter(variants.values())))
+    return menu
+
+def _split_font_ref(ref) -> tuple:
+    """(chemin, index) d'une référence "police.ttc#2" ; (chemin, None) hors collection."""
+    path, sep, index = str(ref).rpartition("#")
+    if sep and index.isdigit() and path.lower().endswith(_FONT_COLLECTIONS):
+        return path, int(index)
+    return str(ref), None
+
+@functools.lru_cache(maxsize=16)
+def _extract_collection_face(path: str, index: int, size: int, mtime: float) -> str:
+    """Écrit la police index de la collection path en fichier autonome (répertoire des
+    tables refait, tables recopiées) dans <tmp>/pdf_header_fonts/ : PyMuPDF n'accepte
+    pas d'index de face. Réutilisé tant que la collection (taille, mtime) ne change pas.
+    OSError / struct.error propagées."""
+    key = hashlib.sha1(f"{path}|{index}|{size}|{mtime}".encode("utf-8")).hexdigest()[:16]
+    with open(path, "rb") as f:
+        version, tables = _sfnt_tables(f, _collection_offsets(f)[index])
+        target = Path(tempfile.gettempdir()) / "pdf_header_fonts" / \
+            f"{key}{'.otf' if version == b'OTTO' else '.ttf'}"
+        if target.exists():
+            return str(target)
+        tags = sorted(tables)
+        selector = len(tags).bit_length() - 1
+        search   = 16 << selector
+        out = [version + struct.pack(">HHHH", len(tags), search, selector, 16 * len(tags) - search)]
+        blobs, pos = [], 12 + 16 * len(tags)
+        for tag in tags:
+            offset, length, checksum = tables[tag]
+            f.seek(offset)
+            blob = f.read(length)
+            blob += b"\0" * (-len(blob) % 4)
+            out.append(struct.pack(">4sIII", tag, checksum, pos, length))
+            blobs.append(blob)
+            pos += len(blob)
+    target.parent.mkdir(exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(b"".join(out + blobs))
+    os.replace(tmp, target)
+    return str(target)
+
+def _font_file_args(ref):
+    """kwargs fontfile pour une référence de police, face de collection extraite au
+    besoin ; None si le fichier est introuvable ou illisible."""
+    path, index = _split_font_ref(ref)
+    try:
+        if index is None:
+            return {"fontfile": path, "fontname": "F0"} if os.path.exists(path) else None
+        st = os.stat(path)
+        return {"fontfile": _extract_collection_face(path, index, st.st_size, st.st_mtime),
+                "fontname": "F0"}
+    except (OSError, struct.error, IndexError, TypeError) as e:
+        _debug_log(f"FONTS [{ref}] illisible : {e}")
+        return None
 
 def _get_fitz_font_args(family: str, font_file, bold: bool, italic: bool) -> dict:
     """
     Retourne les kwargs de police pour insert_textbox().
-    Priorité : font_file (système) > BUILTIN_FONTS > fallback Courier.
+    Priorité : font_file (système, variante gras/italique de l'index si elle existe)
+    > BUILTIN_FONTS > famille de l'index > fallback Courier.
     """
-    if font_file and Path(str(font_file)).exists():
-        return {"fontfile": str(font_file), "fontname": "F0"}
+    if font_file and os.path.exists(_split_font_ref(font_file)[0]):
+        variant = _font_families().get(family, {}).get((bold, italic)) if (bold or italic) else None
+        args = (variant and _font_file_args(variant)) or _font_file_args(font_file)
+        if args:
+            return args
     if family in BUILTIN_FONTS:
         variants = BUILTIN_FONTS[family]
         if bold and italic:
@@ -617,30 +1202,1142 @@ def _get_fitz_font_args(family: str, font_file, bold: bool, italic: bool) -> dic
             key = ("r",)
         fontname = variants.get(key) or variants.get(("r",), "cour")
         return {"fontname": fontname}
+    variants = _font_families().get(family)
+    if variants:
+        face = variants.get((bold, italic)) or variants.get((False, False)) or next(iter(variants.values()))
+        args = _font_file_args(face)
+        if args:
+            return args
     return {"fontname": "cour"}
 
+# Caches process-wide : un fichier de police n'est parsé qu'une fois par process,
+# et la largeur d'un texte donné n'est mesurée qu'une fois (batch, pool, GUI).
+@functools.lru_cache(maxsize=32)
+def _cached_fitz_font(fontfile, fontname, bold: bool, italic: bool):
+    """fitz.Font pour une clé issue de _get_fitz_font_args (+ gras/italique), ou None."""
+    try:
+        if fontfile:
+            return fitz.Font(fontfile=fontfile)
+        return fitz.Font(fontname=fontname or "cour")
+    except Exception:
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def _cached_text_width(fontfile, fontname, bold: bool, italic: bool, text: str, size: float):
+    """Largeur de text en points, fallback approximatif si la police est illisible."""
+    font_obj = _cached_fitz_font(fontfile, fontname, bold, italic)
+    if font_obj is not None:
+        try:
+            return font_obj.text_length(text, size)
+        except Exception:
+            pass
+    return len(text) * size * SIZES["text_w_fallback"]
+
+def _text_width(font_args: dict, bold: bool, italic: bool, text: str, size: float) -> float:
+    return _cached_text_width(font_args.get("fontfile"), font_args.get("fontname"),
+                              bold, italic, text, size)
+
+# ---------------------------------------------------------------------------
+# Moteur d'en-tête — indépendant de Tk (partagé par la GUI et le mode batch)
+# Les réglages sont lus depuis un dict au format DEFAULT_CONFIG.
+# ---------------------------------------------------------------------------
+def _read_file_meta(path: Path) -> dict:
+    """Métadonnées utilisées par l'en-tête et l'aperçu : {"stem", "mtime", "size"}.
+    Un seul stat() ; OSError propagée.
+    """
+    return _meta_from_stat(path, path.stat())
+
+def _meta_from_stat(path: Path, st) -> dict:
+    return {"stem": path.stem, "mtime": st.st_mtime, "size": st.st_size}
+
+def _compose_header_text(cfg: dict, path=None, meta=None) -> str:
+    """Assemble le texte d'en-tête selon les options actives de cfg.
+    path : Path du PDF concerné (nom, date de modification), ou None.
+    meta : _read_file_meta(path) déjà connu — évite un stat() par appel.
+    """
+    # Base
+    if cfg.get("use_custom"):
+        base = str(cfg.get("custom_text", "")).strip()
+    elif cfg.get("use_filename", True):
+        if meta is not None:
+            base = meta["stem"]
+        else:
+            base = path.stem if path is not None else "fichier"
+    else:
+        base = ""
+
+    # Date
+    date_str = ""
+    if cfg.get("use_date"):
+        fmt = cfg.get("date_format") or "%d/%m/%Y"
+        if cfg.get("date_source") == "file_mtime" and (meta is not None or path is not None):
+            try:
+                mtime = meta["mtime"] if meta is not None else path.stat().st_mtime
+                dt = datetime.datetime.fromtimestamp(mtime)
+            except Exception:
+                dt = datetime.datetime.today()
+        else:
+            dt = datetime.datetime.today()
+        try:
+            date_str = dt.strftime(fmt)
+        except Exception:
+            date_str = dt.strftime("%d/%m/%Y")
+
+    # Assemblage
+    date_position = cfg.get("date_position", "suffix")
+    prefix_parts = []
+    if date_str and date_position == "prefix":
+        prefix_parts.append(date_str)
+    if cfg.get("use_prefix"):
+        pfx = str(cfg.get("prefix_text", "")).strip()
+        if pfx:
+            prefix_parts.append(pfx)
+
+    suffix_parts = []
+    if cfg.get("use_suffix"):
+        sfx = str(cfg.get("suffix_text", "")).strip()
+        if sfx:
+            suffix_parts.append(sfx)
+    if date_str and date_position == "suffix":
+        suffix_parts.append(date_str)
+
+    parts = prefix_parts + ([base] if base else []) + suffix_parts
+    return " ".join(parts).strip()
+
+def _ratio_from_preset(preset: str, margin_x: float, margin_y: float,
+                       page_w_pt: float, page_h_pt: float):
+    """Preset 3×3 + marges (pts) → (rx, ry) bornés. None si preset "custom" ou inconnu."""
+    if preset not in POSITION_PRESETS:
+        return None
+    pw = max(page_w_pt, 1.0)
+    ph = max(page_h_pt, 1.0)
+    row_n, col_n = POSITION_PRESETS[preset]
+    if col_n == 0:
+        rx = margin_x / pw
+    elif col_n == 1:
+        rx = 0.5
+    else:
+        rx = 1.0 - margin_x / pw
+    if row_n == 0:
+        ry = margin_y / ph
+    elif row_n == 1:
+        ry = 0.5
+    else:
+        ry = 1.0 - margin_y / ph
+    rx = max(SIZES["pos_ratio_min"], min(SIZES["pos_ratio_max"], rx))
+    ry = max(SIZES["pos_ratio_min"], min(SIZES["pos_ratio_max"], ry))
+    return rx, ry
+
+def _pdf_pt_from_ratio(rx: float, ry: float, page_w_pt: float, page_h_pt: float):
+    """Ratio → coordonnées PDF en points (Y=0 en bas)."""
+    return rx * page_w_pt, (1.0 - ry) * page_h_pt
+
+def _build_stamp_settings(cfg: dict) -> dict:
+    """Valide les réglages de tampon de cfg (bornes SIZES, couleurs en float).
+    Mêmes fallbacks que les champs de la sidebar en cas de saisie invalide.
+    """
+    def _num(key, default, minimum):
+        try:
+            return max(minimum, float(cfg.get(key, default)))
+        except (TypeError, ValueError):
+            return default
+
+    def _opacity(key, default):
+        try:
+            return max(0.0, min(1.0, float(cfg.get(key, default))))
+        except (TypeError, ValueError):
+            return default
+
+    try:
+        font_size = max(int(cfg.get("font_size", 8)), SIZES["font_size_min"])
+    except (TypeError, ValueError):
+        font_size = 8
+    try:
+        rotation = int(cfg.get("rotation", 0))
+    except (TypeError, ValueError):
+        rotation = 0
+    bold   = bool(cfg.get("bold", False))
+    italic = bool(cfg.get("italic", False))
+    return {
+        "font_size":     font_size,
+        "font_args":     _get_fitz_font_args(cfg.get("font_family", "Courier"),
+                                             cfg.get("font_file"), bold, italic),
+        "bold":          bold,
+        "italic":        italic,
+        "color":         hex_to_rgb_float(cfg.get("color_hex", COLORS["text_default"])),
+        "underline":     bool(cfg.get("underline", False)),
+        "line_spacing":  _num("line_spacing", 1.2, SIZES["line_spacing_min"]),
+        "rotation":      rotation,
+        "all_pages":     bool(cfg.get("all_pages", True)),
+        "shared_stamp":  bool(cfg.get("shared_stamp", False)),
+        "use_frame":     bool(cfg.get("use_frame", False)),
+        "frame_color":   hex_to_rgb_float(cfg.get("frame_color_hex", COLORS["frame_default"])),
+        "frame_width":   _num("frame_width", 1.0, SIZES["frame_width_min"]),
+        "frame_style":   cfg.get("frame_style", "solid"),
+        "frame_padding": _num("frame_padding", 3.0, SIZES["frame_pad_min"]),
+        "frame_opacity": _opacity("frame_opacity", 1.0),
+        "use_bg":        bool(cfg.get("use_bg", False)),
+        "bg_color":      hex_to_rgb_float(cfg.get("bg_color_hex", COLORS["bg_default"])),
+        "bg_opacity":    _opacity("bg_opacity", 0.8),
+    }
+
+def _stamp_position(cfg: dict, page_w_pt: float, page_h_pt: float):
+    """Position d'insertion (x_pt, y_pt) pour une page de référence de cette taille.
+    Preset actif → recalculé depuis les marges, sinon last_x_ratio / last_y_ratio.
+    """
+    try:
+        mx = float(cfg.get("margin_x_pt", 20.0))
+        my = float(cfg.get("margin_y_pt", 20.0))
+    except (TypeError, ValueError):
+        mx, my = 20.0, 20.0
+    ratio = _ratio_from_preset(cfg.get("preset_position", "tr"), mx, my, page_w_pt, page_h_pt)
+    if ratio is None:
+        ratio = (cfg.get("last_x_ratio", 0.85), cfg.get("last_y_ratio", 0.03))
+    return _pdf_pt_from_ratio(ratio[0], ratio[1], page_w_pt, page_h_pt)
+
+class _StampCancelled(Exception):
+    """Traitement interrompu à la demande de l'utilisateur (bouton Annuler)."""
+
+# MuPDF n'est pas thread-safe : un seul thread à la fois manipule des documents
+# (tampon, chargement / préchargement de l'aperçu, rendu).
+_MUPDF_LOCK = threading.Lock()
+
+def _draw_header(pg, header_text: str, x_pt: float, y_pt: float, st: dict, text_width: float):
+    """Dessine fond, cadre, texte et soulignement sur une page (tracé direct)."""
+    font_size  = st["font_size"]
+    pg_w = pg.rect.width
+    pg_h = pg.rect.height
+    # Conversion Y : fitz (Y=0 en haut)
+    fitz_y = pg_h - y_pt
+
+    # half_h : demi-hauteur d'une ligne — sert à centrer texte/cadre/fond sur fitz_y
+    lineheight = st["line_spacing"]  # facteur multiplicateur de fontsize (ex: 1.2 → 1.2×12=14.4 pts)
+    half_h = font_size * lineheight / 2
+
+    # Fond et cadre (avant le texte) — centrés sur (x_pt, fitz_y)
+    if st["use_bg"] or st["use_frame"]:
+        pad = st["frame_padding"]
+        bg_rect = fitz.Rect(
+            x_pt - text_width / 2 - pad,
+            fitz_y - half_h - pad,
+            x_pt + text_width / 2 + pad,
+            fitz_y + half_h + pad
+        )
+        if st["use_bg"]:
+            pg.draw_rect(bg_rect,
+                         fill=st["bg_color"],
+                         fill_opacity=st["bg_opacity"],
+                         color=None,
+                         width=0)
+        if st["use_frame"]:
+            dashes = "[3 3] 0" if st["frame_style"] == "dashed" else None
+            pg.draw_rect(bg_rect,
+                         color=st["frame_color"],
+                         width=st["frame_width"],
+                         stroke_opacity=st["frame_opacity"],
+                         fill=None,
+                         dashes=dashes)
+
+    # Rect d'insertion du texte — centré sur (x_pt, fitz_y)
+    # y0 = fitz_y - half_h → insert_textbox remplit vers le bas sur font_size*lineheight
+    # → centre visuel du texte ≈ fitz_y, cohérent avec l'overlay (anchor="center")
+    half_w = max(pg_w / 2, text_width / 2 + 10)
+    text_rect = fitz.Rect(
+        max(0, x_pt - half_w),
+        fitz_y - half_h,
+        min(pg_w, x_pt + half_w),
+        fitz_y + half_h * 2   # marge extra en bas pour éviter toute troncature
+    )
+    _debug_log(
+        f"  page[{pg.number}] pg=({pg_w:.1f}x{pg_h:.1f}) "
+        f"fitz_y={fitz_y:.1f} text_rect={text_rect}"
+    )
+
+    pg.insert_textbox(
+        text_rect,
+        header_text,
+        fontsize=font_size,
+        color=st["color"],
+        rotate=st["rotation"],
+        lineheight=lineheight,
+        align=fitz.TEXT_ALIGN_CENTER,
+        **st["font_args"],
+    )
+
+    # Soulignement — centré sur x_pt
+    if st["underline"]:
+        ul_y = fitz_y + font_size * SIZES["underline_offset"]
+        pg.draw_line(
+            fitz.Point(x_pt - text_width / 2, ul_y),
+            fitz.Point(x_pt + text_width / 2, ul_y),
+            color=st["color"],
+            width=max(0.5, font_size * SIZES["underline_width"])
+        )
+
+def _show_stamp_form(pg, stamp_doc, stamp_pno: int):
+    """Pose stamp_doc[stamp_pno] sur pg via show_pdf_page() (greffe du XObject).
+    Retourne (nom, xref du Form, xref du flux "q /nom Do Q") pour réutilisation
+    sur les pages de même géométrie, ou None si non identifiable.
+    """
+    doc = pg.parent
+    before_xobjects = {x[0] for x in pg.get_xobjects()}
+    before_contents = set(pg.get_contents())
+    pg.show_pdf_page(pg.rect, stamp_doc, stamp_pno)
+    form = next(((xref, name) for xref, name, invoker, _bbox in pg.get_xobjects()
+                 if invoker == 0 and xref not in before_xobjects), None)
+    if form is None:
+        return None
+    marker = f"/{form[1]} Do".encode()
+    for cx in pg.get_contents():
+        if cx not in before_contents and marker in doc.xref_stream(cx):
+            return form[1], form[0], cx
+    return None
+
+def _reuse_stamp_form(pg, name: str, form_xref: int, content_xref: int) -> bool:
+    """Référence un Form déjà greffé : /XObject /nom + flux de contenu partagé.
+    show_pdf_page() rescanne les ressources à chaque appel — coût O(n²) quand les
+    pages partagent un même dict /Resources. Ici : quelques accès xref par page.
+    False (rien modifié) si ressources héritées ou nom déjà utilisé.
+    """
+    doc = pg.parent
+    kind, value = doc.xref_get_key(pg.xref, "Resources")
+    if kind == "xref":
+        holder, path = int(value.split()[0]), ""
+    elif kind == "dict":
+        holder, path = pg.xref, "Resources/"
+    else:
+        return False   # /Resources hérité du nœud /Pages
+    kind, value = doc.xref_get_key(holder, path + "XObject")
+    if kind == "xref":
+        holder, path = int(value.split()[0]), ""
+    elif kind in ("dict", "null"):
+        path += "XObject/"
+    else:
+        return False
+    kind, value = doc.xref_get_key(holder, path + name)
+    if kind != "null" and value != f"{form_xref} 0 R":
+        return False
+    if kind == "null":
+        doc.xref_set_key(holder, path + name, f"{form_xref} 0 R")
+
+    pg.wrap_contents()  # état graphique équilibré, comme show_pdf_page(overlay=True)
+    contents = pg.get_contents() + [content_xref]
+    doc.xref_set_key(pg.xref, "Contents", "[" + " ".join(f"{x} 0 R" for x in contents) + "]")
+    return True
+
+def _stamp_document(doc, header_text: str, x_pt: float, y_pt: float, st: dict,
+                    progress=None, cancel=None) -> int:
+    """Dessine l'en-tête sur les pages de doc (réglages issus de _build_stamp_settings).
+    Mode "tampon partagé" (st["shared_stamp"]) : l'en-tête est tracé une seule fois
+    par taille de page dans un PDF temporaire, greffé avec show_pdf_page() puis
+    référencé par les pages suivantes — toutes pointent vers le même XObject.
+    Les pages pivotées (/Rotate) restent en tracé direct.
+    progress : callable(phase, done, total) appelé après chaque page ("pages").
+    cancel   : threading.Event vérifié entre deux pages → _StampCancelled.
+    Retourne le nombre de pages traitées.
+    """
+    font_size = st["font_size"]
+    pages_to_process = range(len(doc)) if st["all_pages"] else [0]
+    total = len(pages_to_process)
+
+    # Largeur texte pour fond/cadre/soulignement — identique sur toutes les pages
+    text_width = len(header_text) * font_size * SIZES["text_w_fallback"]  # fallback
+    if st["use_bg"] or st["use_frame"] or st["underline"]:
+        text_width = _text_width(st["font_args"], st["bold"], st["italic"], header_text, font_size)
+
+    shared      = bool(st.get("shared_stamp"))
+    stamp_docs  = {}   # (largeur, hauteur) → PDF d'une page portant l'en-tête seul
+    stamp_forms = {}   # (MediaBox, CropBox) → (nom, xref Form, xref flux) dans doc
+    try:
+        for n, i in enumerate(pages_to_process):
+            if cancel is not None and cancel.is_set():
+                raise _StampCancelled()
+            pg = doc[i]
+            if not shared or pg.rotation:
+                _draw_header(pg, header_text, x_pt, y_pt, st, text_width)
+            else:
+                geometry = (tuple(pg.mediabox), tuple(pg.cropbox))
+                form = stamp_forms.get(geometry)
+                if form is None or not _reuse_stamp_form(pg, *form):
+                    # Un PDF par taille : un document source déjà greffé ne doit plus changer
+                    size = (round(pg.rect.width, 2), round(pg.rect.height, 2))
+                    if size not in stamp_docs:
+                        stamp_doc = fitz.open()
+                        sp = stamp_doc.new_page(width=pg.rect.width, height=pg.rect.height)
+                        _draw_header(sp, header_text, x_pt, y_pt, st, text_width)
+                        stamp_docs[size] = stamp_doc
+                    form = _show_stamp_form(pg, stamp_docs[size], 0)
+                    if form is not None:
+                        stamp_forms.setdefault(geometry, form)
+
+            if progress is not None:
+                progress("pages", n + 1, total)
+    finally:
+        for stamp_doc in stamp_docs.values():
+            stamp_doc.close()
+
+    return total
+
+def _output_location(path: Path, root=None):
+    """(dossier de sortie, chemin relatif) de path : <dossier_source>_avec_entete/<nom>.pdf.
+    Avec root (dossier scanné, éventuellement récursivement) : l'arborescence sous root
+    est reproduite dans <root>_avec_entete/.
+    """
+    if root is not None:
+        root = Path(root)
+        try:
+            rel = path.relative_to(root)
+        except ValueError:
+            pass
+        else:
+            return root.with_name(root.name + "_avec_entete"), rel
+    return path.parent.with_name(path.parent.name + "_avec_entete"), Path(path.name)
+
+def _output_path_for(path: Path, root=None) -> Path:
+    """Chemin de sortie de path (voir _output_location)."""
+    out_root, rel = _output_location(path, root)
+    return out_root / rel
+
+# ---------------------------------------------------------------------------
+# Manifeste des dossiers de sortie — fichiers déjà tamponnés
+# ---------------------------------------------------------------------------
+MANIFEST_NAME     = ".pdf_header_manifest.json"
+_MANIFEST_VERSION = 1
+# Clés de config sans effet sur le fichier produit
+_MANIFEST_IGNORED_KEYS = {"batch_workers", "scan_recursive", "info_workers",
+                          "dedup_inputs", "ui_font_size", "debug_enabled"}
+
+def _settings_digest(cfg: dict) -> str:
+    """Empreinte des réglages qui déterminent le fichier produit (clés de DEFAULT_CONFIG).
+    Identique pour la config complète du batch et les réglages de _collect_settings().
+    La date du jour n'y entre pas : un fichier déjà tamponné n'est pas refait le lendemain."""
+    effective = {k: cfg.get(k, v) for k, v in DEFAULT_CONFIG.items()
+                 if k not in _MANIFEST_IGNORED_KEYS}
+    blob = json.dumps(effective, sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+class _Manifests:
+    """Manifestes des dossiers de sortie (MANIFEST_NAME à la racine de chaque
+    <dossier>_avec_entete/). Pour chaque source tamponnée : taille et mtime, empreinte
+    des réglages, sortie et sa taille. Une source dont l'entrée correspond encore est
+    traitée sans être ouverte. Lu au premier accès, écrit par flush() (temp + rename).
+    Thread-safe : interrogé par le thread de scan, complété par le thread Tk.
+    """
+
+    def __init__(self):
+        self._roots = {}      # dossier de sortie → {chemin relatif posix: entrée}
+        self._dirty = set()
+        self._lock  = threading.Lock()
+
+    def _entries(self, out_root: Path) -> dict:
+        entries = self._roots.get(out_root)
+        if entries is None:
+            try:
+                data = json.loads((out_root / MANIFEST_NAME).read_text(encoding="utf-8"))
+                entries = data["entries"] if data.get("version") == _MANIFEST_VERSION else {}
+            except Exception:
+                entries = {}
+            self._roots[out_root] = entries
+        return entries
+
+    def is_current(self, path: Path, meta: dict, root, digest: str) -> bool:
+        """Vrai si path a déjà été tamponné avec ces réglages, n'a pas changé depuis
+        et que sa sortie est toujours là (un stat de la sortie, aucune ouverture)."""
+        out_root, rel = _output_location(path, root)
+        with self._lock:
+            entry = self._entries(out_root).get(rel.as_posix())
+        if entry is None or entry["settings"] != digest or \
+                entry["size"] != meta["size"] or entry["mtime"] != meta["mtime"]:
+            return False
+        try:
+            return (out_root / rel).stat().st_size == entry["out_size"]
+        except OSError:
+            return False
+
+    def record(self, path: Path, meta: dict, root, digest: str, out_size: int):
+        """meta : _read_file_meta(path) relevé avant le traitement."""
+        out_root, rel = _output_location(path, root)
+        with self._lock:
+            self._entries(out_root)[rel.as_posix()] = {
+                "size":     meta["size"],
+                "mtime":    meta["mtime"],
+                "settings": digest,
+                "out":      rel.as_posix(),
+                "out_size": out_size,
+            }
+            self._dirty.add(out_root)
+
+    def flush(self):
+        with self._lock:
+            pending = {root: json.dumps({"version": _MANIFEST_VERSION,
+                                         "entries": self._roots[root]})
+                       for root in self._dirty}
+            self._dirty.clear()
+        for out_root, blob in pending.items():
+            target = out_root / MANIFEST_NAME
+            tmp = target.with_name(target.name + ".tmp")
+            try:
+                tmp.write_text(blob, encoding="utf-8")
+                os.replace(tmp, target)
+            except OSError as e:
+                _debug_log(f"MANIFEST [{target}] non enregistré : {e}")
+
+_PDF_MAGIC_WINDOW = 1024   # "%PDF" peut être précédé de quelques octets (tolérance des lecteurs)
+
+def _has_pdf_magic(path: Path) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return b"%PDF" in f.read(_PDF_MAGIC_WINDOW)
+    except OSError:
+        return False
+
+def _scan_pdfs(root: Path, recursive: bool = False, cancel=None, check_magic: bool = True):
+    """Générateur (path, meta) des PDFs de root, produits au fil du parcours os.scandir :
+    extension .pdf et signature %PDF (sauf check_magic=False : aucun fichier ouvert).
+    Noms triés dans chaque dossier, fichiers avant sous-dossiers ; les dossiers de
+    sortie *_avec_entete sont ignorés.
+    meta : même format que _read_file_meta().
+    """
+    stack = [Path(root)]
+    while stack:
+        folder = stack.pop()
+        try:
+            with os.scandir(folder) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            _debug_log(f"SCAN [{folder}] illisible: {e}")
+            continue
+        subdirs = []
+        for entry in entries:
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not entry.name.endswith("_avec_entete"):
+                        subdirs.append(Path(entry.path))
+                    continue
+                if not entry.name.lower().endswith(".pdf") or not entry.is_file():
+                    continue
+                path = Path(entry.path)
+                if check_magic and not _has_pdf_magic(path):
+                    continue
+                meta = _meta_from_stat(path, entry.stat())
+            except OSError:
+                continue
+            yield path, meta
+        stack.extend(reversed(subdirs))
+
+def _partial_path(out_path: Path) -> Path:
+    """Fichier temporaire d'écriture, renommé en out_path une fois complet."""
+    return out_path.with_name(out_path.name + ".part")
+
+@functools.lru_cache(maxsize=1)
+def _web_profile_supported() -> bool:
+    """MuPDF ≥ 1.24 ne sait plus linéariser : essai sur un document d'une page vide."""
+    try:
+        with fitz.open() as doc:
+            doc.new_page()
+            doc.tobytes(**SAVE_PROFILES["web"])
+        return True
+    except Exception:
+        return False
+
+def _effective_save_profile(profile: str) -> str:
+    """Profil réellement appliqué par _save_document pour profile (hors replis par
+    fichier, ex. incremental → fast sur un fichier réparé)."""
+    if profile not in SAVE_PROFILES:
+        return "compact"
+    if profile == "web" and not _web_profile_supported():
+        return "compact"
+    return profile
+
+def _save_document(doc, out_path: Path, profile: str) -> str:
+    """Enregistre doc selon SAVE_PROFILES[profile] ; retourne le profil appliqué.
+    "incremental" : doc doit avoir été ouvert depuis out_path.
+    "web" : MuPDF ≥ 1.24 ne sait plus linéariser → repli sur "compact".
+    """
+    if profile == "incremental":
+        doc.save(str(out_path), encryption=fitz.PDF_ENCRYPT_KEEP, **SAVE_PROFILES[profile])
+        return profile
+    if profile == "web" and not _web_profile_supported():
+        profile = "compact"
+    if profile == "web":
+        try:
+            doc.save(str(out_path), **SAVE_PROFILES[profile])
+            return profile
+        except Exception as e:
+            _debug_log(f"SAVE web indisponible ({e}) — repli sur compact")
+            profile = "compact"
+    doc.save(str(out_path), **SAVE_PROFILES[profile])
+    return profile
+
+def _open_for_profile(path: Path, part_path: Path, profile: str):
+    """Ouvre le document à tamponner : (doc, profil effectif).
+    "incremental" travaille sur une copie de la source (part_path), sauf si MuPDF
+    a dû réparer le fichier à l'ouverture — repli sur "fast" dans ce cas.
+    """
+    if profile == "incremental":
+        shutil.copyfile(path, part_path)
+        doc = fitz.open(str(part_path))
+        if doc.can_save_incrementally():
+            return doc, profile
+        doc.close()
+        _debug_log(f"SAVE [{path.name}] incremental impossible (fichier réparé) — repli sur fast")
+        profile = "fast"
+    return fitz.open(str(path)), profile
+
+def _stamp_file(path: Path, out_path: Path, cfg: dict, progress=None, cancel=None) -> dict:
+    """Ouvre path, applique l'en-tête décrit par cfg et enregistre out_path.
+    L'écriture passe par _partial_path(out_path) : aucun fichier partiel n'est laissé
+    en cas d'erreur ou d'annulation. progress reçoit aussi ("save", 0, 0) avant
+    l'enregistrement. Exceptions propagées.
+    Retourne les mesures : pages, open_ms, stamp_ms (boucle des pages), save_ms,
+    bytes_out, save_profile.
+    """
+    st = _build_stamp_settings(cfg)
+    header_text = _compose_header_text(cfg, path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = _partial_path(out_path)
+    profile = cfg.get("save_profile", "compact")
+    if profile not in SAVE_PROFILES:
+        profile = "compact"
+
+    try:
+        t0 = time.perf_counter()
+        doc_out, profile = _open_for_profile(path, part_path, profile)
+        t_open = time.perf_counter()
+        try:
+            page0 = doc_out[0]
+            x_pt, y_pt = _stamp_position(cfg, page0.rect.width, page0.rect.height)
+            _debug_log(
+                f"APPLY [{path.name}] x_pt={x_pt:.1f} y_pt={y_pt:.1f} "
+                f"rotation={st['rotation']} font={cfg.get('font_family')}"
+            )
+            n_pages = _stamp_document(doc_out, header_text, x_pt, y_pt, st, progress, cancel)
+            if progress is not None:
+                progress("save", 0, 0)
+            t1 = time.perf_counter()
+            profile = _save_document(doc_out, part_path, profile)
+            t2 = time.perf_counter()
+        finally:
+            doc_out.close()
+        if cancel is not None and cancel.is_set():
+            raise _StampCancelled()
+        os.replace(part_path, out_path)
+    except BaseException:
+        try:
+            part_path.unlink()
+        except OSError:
+            pass
+        raise
+
+    stats = {
+        "pages":        n_pages,
+        "open_ms":      (t_open - t0) * 1000,
+        "stamp_ms":     (t1 - t_open) * 1000,
+        "save_ms":      (t2 - t1) * 1000,
+        "bytes_out":    out_path.stat().st_size,
+        "save_profile": profile,
+    }
+    _debug_log(
+        f"SAVE [{path.name}] profil={profile} {stats['save_ms']:.0f} ms "
+        f"{stats['bytes_out']} octets"
+    )
+    return stats
+
+def _stamp_worker(path_str: str, out_path_str: str, cfg: dict, cancel=None):
+    """Point d'entrée d'un processus du pool — arguments et retour picklables.
+    Retourne (mesures, erreur) : erreur vaut None en cas de succès, sinon un message
+    (mesures vaut alors None). cancel n'est transmis qu'en mode séquentiel
+    (même process) ; _StampCancelled est propagée.
+    """
+    try:
+        return _stamp_file(Path(path_str), Path(out_path_str), cfg, cancel=cancel), None
+    except _StampCancelled:
+        raise
+    except PermissionError:
+        return None, "Le fichier est ouvert dans un autre programme."
+    except Exception as e:
+        return None, str(e) or type(e).__name__
+
+def _batch_worker_count(requested, n_jobs: int) -> int:
+    """Nombre de processus effectif : requested <= 0 → nb de cœurs, borné par n_jobs."""
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        requested = 0
+    if requested <= 0:
+        requested = os.cpu_count() or 1
+    return max(1, min(requested, n_jobs))
+
+def _iter_batch(jobs, cfg: dict, workers: int, cancel=None):
+    """Traite jobs = [(clé, path, out_path), ...] et produit (clé, mesures, erreur)
+    au fil des fins de traitement. workers > 1 → ProcessPoolExecutor (spawn).
+    cancel (threading.Event) : les fichiers pas encore démarrés sont abandonnés,
+    ceux en cours dans un worker se terminent normalement.
+    """
+    if workers <= 1:
+        for key, path, out_path in jobs:
+            if cancel is not None and cancel.is_set():
+                return
+            try:
+                with _MUPDF_LOCK:
+                    stats, err = _stamp_worker(str(path), str(out_path), cfg, cancel)
+            except _StampCancelled:
+                return
+            _record_stamp_spans(stats)
+            yield key, stats, err
+        return
+    # spawn sur toutes les plateformes : pas de fork d'un process qui porte Tk et des threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                             initializer=_init_pool_worker, initargs=(_DEBUG_ENABLED,)) as pool:
+        futures = {pool.submit(_stamp_worker, str(path), str(out_path), cfg): key
+                   for key, path, out_path in jobs}
+        pending = set(futures)
+        while pending:
+            if cancel is not None and cancel.is_set():
+                for fut in pending:
+                    fut.cancel()
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.cancelled():
+                    continue
+                try:
+                    stats, err = fut.result()
+                except Exception as e:  # BrokenProcessPool : worker tué
+                    stats, err = None, str(e) or type(e).__name__
+                _record_stamp_spans(stats)
+                if _DEBUG_ENABLED:
+                    _DEBUG_WRITER.check_size()
+                yield futures[fut], stats, err
+
+# ---------------------------------------------------------------------------
+# Dédoublonnage des sources identiques
+# ---------------------------------------------------------------------------
+def _content_digest(path: Path) -> str:
+    """SHA-256 du contenu de path, lu par blocs de 1 Mo (hashlib.file_digest : 3.11+)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _dedup_jobs(jobs, cfg: dict):
+    """Sépare jobs = [(clé, path, out_path), ...] en (à tamponner, copies).
+    Deux sources de même contenu et de même texte d'en-tête donnent la même sortie :
+    seule la première est tamponnée. Seuls les fichiers dont la taille est partagée
+    sont hachés. copies : {clé tamponnée: [(clé, out_path), ...]}.
+    """
+    by_size = {}
+    for job in jobs:
+        try:
+            by_size.setdefault(job[1].stat().st_size, []).append(job)
+        except OSError:
+            pass
+    firsts, copies, skipped = {}, {}, set()
+    for group in by_size.values():
+        if len(group) < 2:
+            continue
+        for key, path, out_path in group:
+            try:
+                # Le texte tient compte du nom et de la date du fichier s'ils y figurent
+                sig = (_content_digest(path), _compose_header_text(cfg, path))
+            except OSError:
+                continue
+            first = firsts.setdefault(sig, key)
+            if first != key:
+                copies.setdefault(first, []).append((key, out_path))
+                skipped.add(key)
+    return [job for job in jobs if job[0] not in skipped], copies
+
+def _link_output(src: Path, dst: Path) -> str:
+    """Reproduit la sortie src en dst : lien physique si le système de fichiers le
+    permet, sinon copie. Écriture via _partial_path(dst) comme _stamp_file().
+    Retourne "link" ou "copy"."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    part_path = _partial_path(dst)
+    try:
+        part_path.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, part_path)
+        how = "link"
+    except OSError:
+        shutil.copyfile(src, part_path)
+        how = "copy"
+    os.replace(part_path, dst)
+    return how
+
+def _iter_batch_dedup(jobs, cfg: dict, workers: int, cancel=None):
+    """_iter_batch() précédé de _dedup_jobs() (si cfg["dedup_inputs"]) : les copies
+    d'une source sont produites juste après elle, par lien ou copie de sa sortie.
+    Leurs mesures sont celles de la source, avec les durées à 0 et "linked"."""
+    if not cfg.get("dedup_inputs", True):
+        yield from _iter_batch(jobs, cfg, workers, cancel)
+        return
+    out_paths = {key: out_path for key, _path, out_path in jobs}
+    jobs, copies = _dedup_jobs(jobs, cfg)
+    if copies:
+        _debug_log(f"DEDUP {sum(map(len, copies.values()))} copie(s) de "
+                   f"{len(copies)} source(s) : sorties liées au lieu d'être recalculées")
+    for key, stats, err in _iter_batch(jobs, cfg, workers, cancel):
+        yield key, stats, err
+        for copy_key, out_path in copies.get(key, ()):
+            if cancel is not None and cancel.is_set():
+                return
+            if err:
+                yield copy_key, None, err
+                continue
+            try:
+                how = _link_output(out_paths[key], out_path)
+            except OSError as e:
+                yield copy_key, None, str(e) or type(e).__name__
+                continue
+            yield copy_key, dict(stats, open_ms=0.0, stamp_ms=0.0, save_ms=0.0, linked=how), None
+
+# ---------------------------------------------------------------------------
+# Rapport de session — débit par fichier
+# ---------------------------------------------------------------------------
+REPORT_SLOWEST = 5   # fichiers les plus lents cités dans le résumé
+
+class _SessionReport:
+    """Une ligne JSONL par fichier terminé (traité, passé, en erreur), écrite au fil de
+    l'eau dans <dossier de sortie>/pdf_header_report_<début de session>.jsonl :
+    octets en entrée, pages, ms d'ouverture / de tampon / d'enregistrement, octets
+    en sortie, état. Garde les totaux pour summary().
+    """
+
+    def __init__(self):
+        self.started = datetime.datetime.now()
+        self.rows    = []
+        self.paths   = []     # fichiers JSONL ouverts, dans l'ordre de création
+        self._files  = {}     # dossier de sortie → fichier ouvert
+        self._lock   = threading.Lock()
+
+    def record(self, path: Path, state: str, root=None, stats=None, bytes_in=None):
+        out_root, rel = _output_location(path, root)
+        stats = stats or {}
+        row = {
+            "time":      datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "file":      rel.as_posix(),
+            "state":     state,
+            "bytes_in":  bytes_in,
+            "pages":     stats.get("pages"),
+            "open_ms":   round(stats.get("open_ms", 0.0), 1),
+            "stamp_ms":  round(stats.get("stamp_ms", 0.0), 1),
+            "save_ms":   round(stats.get("save_ms", 0.0), 1),
+            "bytes_out": stats.get("bytes_out"),
+        }
+        if stats.get("save_profile"):
+            row["save_profile"] = stats["save_profile"]
+        if stats.get("linked"):
+            row["linked"] = stats["linked"]
+        with self._lock:
+            self.rows.append(row)
+            try:
+                f = self._files.get(out_root)
+                if f is None:
+                    out_root.mkdir(parents=True, exist_ok=True)
+                    target = out_root / f"pdf_header_report_{self.started:%Y%m%d_%H%M%S}.jsonl"
+                    f = self._files[out_root] = open(target, "a", encoding="utf-8", buffering=1)
+                    self.paths.append(target)
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            except OSError as e:
+                _debug_log(f"REPORT [{out_root}] non écrit : {e}")
+
+    def summary(self) -> dict:
+        with self._lock:
+            rows = list(self.rows)
+        done = [r for r in rows if r["state"] == "traite"]
+        # Débit : fichiers réellement tamponnés (les doublons liés ne coûtent rien)
+        stamped = [r for r in done if not r.get("linked")]
+        busy_ms = {id(r): r["open_ms"] + r["stamp_ms"] + r["save_ms"] for r in stamped}
+        pages   = sum(r["pages"] or 0 for r in stamped)
+        busy_s  = sum(busy_ms.values()) / 1000
+        return {
+            "states":      {st: sum(r["state"] == st for r in rows) for st in FILE_STATES[1:]},
+            "pages":       pages,
+            "bytes_in":    sum(r["bytes_in"] or 0 for r in done),
+            "bytes_out":   sum(r["bytes_out"] or 0 for r in done),
+            "busy_s":      busy_s,
+            "wall_s":      (datetime.datetime.now() - self.started).total_seconds(),
+            "pages_per_s": pages / busy_s if busy_s else 0.0,
+            "profiles":    Counter(r["save_profile"] for r in stamped
+                                               if r.get("save_profile")),
+            "slowest":     [(r["file"], busy_ms[id(r)], r["pages"])
+                            for r in sorted(stamped, key=lambda r: -busy_ms[id(r)])[:REPORT_SLOWEST]],
+        }
+
+    def summary_lines(self) -> list:
+        """Résumé lisible (fin de session GUI, fin de batch)."""
+        s = self.summary()
+        st = s["states"]
+        lines = [
+            f"{st['traite']} traité(s), {st['passe']} passé(s), {st['erreur']} en erreur",
+            f"{s['pages']} page(s) en {s['busy_s']:.1f} s de traitement "
+            f"({s['wall_s']:.0f} s de session) — {s['pages_per_s']:.1f} pages/s",
+            f"Entrée {s['bytes_in'] / 1_048_576:.1f} Mo → sortie {s['bytes_out'] / 1_048_576:.1f} Mo",
+        ]
+        if s["profiles"]:
+            lines.append("Profil d'enregistrement : " + ", ".join(
+                f"{name} ×{n}" for name, n in s["profiles"].most_common()))
+        if s["slowest"]:
+            lines.append("Plus lents :")
+            lines += [f"  {name} — {ms:.0f} ms ({pages} p.)" for name, ms, pages in s["slowest"]]
+        return lines
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+# ---------------------------------------------------------------------------
+# Infos des cartes fichiers (pages, format, chiffrement, taille)
+# ---------------------------------------------------------------------------
+_PAPER_SIZES = {
+    "A3":     (842, 1191),
+    "A4":     (595, 842),
+    "A5":     (420, 595),
+    "Letter": (612, 792),
+    "Legal":  (612, 1008),
+}
+
+def _read_pdf_info(path_str: str) -> dict:
+    """Point d'entrée du pool d'infos — ouvre le PDF sans rien rendre.
+    Retourne {"pages", "page_w", "page_h", "encrypted", "bytes"} (pages / dimensions
+    à None si un mot de passe est requis), ou {"error": message}.
+    """
+    try:
+        size = os.path.getsize(path_str)
+        with fitz.open(path_str) as doc:
+            info = {"pages": None, "page_w": None, "page_h": None,
+                    "encrypted": bool(doc.is_encrypted or doc.needs_pass), "bytes": size}
+            if not doc.needs_pass:
+                info["pages"] = doc.page_count
+                if doc.page_count:
+                    rect = doc[0].rect
+                    info["page_w"], info["page_h"] = rect.width, rect.height
+            return info
+    except Exception as e:
+        return {"error": str(e) or type(e).__name__}
+
+def _paper_label(w_pt: float, h_pt: float) -> str:
+    """Nom du format (A4, Letter…) à 3 pt près, orientation ignorée ; sinon dimensions en mm."""
+    lo, hi = sorted((w_pt, h_pt))
+    for name, (a, b) in _PAPER_SIZES.items():
+        if abs(lo - a) <= 3 and abs(hi - b) <= 3:
+            return name
+    return f"{w_pt / 72 * 25.4:.0f}×{h_pt / 72 * 25.4:.0f} mm"
+
+def _info_summary(info: dict) -> str:
+    """Résumé court pour une carte : "12 p. · A4 · 1.4 Mo" (🔒 si chiffré)."""
+    if "error" in info:
+        return "illisible"
+    parts = []
+    if info["pages"] is not None:
+        parts.append(f"{info['pages']} p.")
+    if info["page_w"]:
+        parts.append(_paper_label(info["page_w"], info["page_h"]))
+    if info["bytes"] < 1_048_576:
+        parts.append(f"{info['bytes'] / 1024:.0f} Ko")
+    else:
+        parts.append(f"{info['bytes'] / 1_048_576:.1f} Mo")
+    if info["encrypted"]:
+        parts.append("🔒")
+    return " · ".join(parts)
+
+# ---------------------------------------------------------------------------
+# État de traitement des fichiers
+# ---------------------------------------------------------------------------
+FILE_STATES  = ("non_traite", "traite", "passe", "erreur")
+_STATE_CODES = {s: i for i, s in enumerate(FILE_STATES)}
+
+class _FileStates:
+    """État de n fichiers (index 0..n-1) : un octet par fichier, compteurs par état
+    et index trié des non traités. Compteurs en O(1) ; recherche du prochain non traité
+    en O(log n) (bisect). Un changement d'état vers / depuis "non_traite" déplace la
+    fin de la liste (del / insort) : O(n) en pire cas, mais un memmove, pas un
+    parcours de la file en Python.
+    S'utilise comme un dict {index: état} (get / [] / []=).
+    """
+
+    def __init__(self, n: int = 0):
+        self._codes     = bytearray(n)          # 0 = "non_traite"
+        self._counts    = [n] + [0] * (len(FILE_STATES) - 1)
+        self._untreated = list(range(n))        # trié
+
+    def __len__(self):
+        return len(self._codes)
+
+    def __getitem__(self, idx: int) -> str:
+        return FILE_STATES[self._codes[idx]]
+
+    def get(self, idx: int, default: str = "non_traite") -> str:
+        if 0 <= idx < len(self._codes):
+            return FILE_STATES[self._codes[idx]]
+        return default
+
+    def __setitem__(self, idx: int, state: str):
+        new = _STATE_CODES[state]
+        old = self._codes[idx]
+        if new == old:
+            return
+        self._codes[idx] = new
+        self._counts[old] -= 1
+        self._counts[new] += 1
+        if old == 0:
+            del self._untreated[bisect_left(self._untreated, idx)]
+        elif new == 0:
+            insort(self._untreated, idx)
+
+    def extend(self, n: int):
+        """Ajoute n fichiers non traités en fin de file (scan incrémental)."""
+        start = len(self._codes)
+        self._codes.extend(bytes(n))
+        self._counts[0] += n
+        self._untreated.extend(range(start, start + n))
+
+    def count(self, *states: str) -> int:
+        """Nombre de fichiers dans l'un des états donnés."""
+        return sum(self._counts[_STATE_CODES[s]] for s in states)
+
+    def untreated(self) -> list:
+        """Index des fichiers non traités, dans l'ordre."""
+        return list(self._untreated)
+
+    def next_untreated(self, after: int):
+        """Premier non traité après after, en reprenant au début (after exclu) ; None sinon."""
+        pos = bisect_right(self._untreated, after)
+        if pos < len(self._untreated):
+            return self._untreated[pos]
+        if self._untreated and self._untreated[0] != after:
+            return self._untreated[0]
+        return None
+
+# ---------------------------------------------------------------------------
+# Cache des aperçus rendus
+# ---------------------------------------------------------------------------
+def _quantize_scale(scale: float) -> float:
+    """Arrondit scale (par défaut) au palier géométrique SIZES["preview_scale_step"] :
+    deux tailles de canvas voisines donnent la même échelle, donc la même entrée de cache.
+    """
+    step = math.log1p(SIZES["preview_scale_step"])
+    return round(math.exp(math.floor(math.log(scale) / step + 1e-9) * step), 4)
+
+class _PreviewCache:
+    """LRU d'images PIL (RGB) indexées par (chemin, mtime, page, échelle quantifiée),
+    borné en mémoire (octets des pixels)."""
+
+    def __init__(self, max_mb: float):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.n_bytes   = 0
+        self._items    = OrderedDict()
+        self._lock     = threading.Lock()   # alimenté aussi par le thread de préchargement
+
+    def get(self, key):
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+            return img
+
+    def put(self, key, img):
+        size = img.width * img.height * len(img.getbands())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.n_bytes -= old.width * old.height * len(old.getbands())
+            self._items[key] = img
+            self.n_bytes += size
+            while self.n_bytes > self.max_bytes:
+                _, ev = self._items.popitem(last=False)
+                self.n_bytes -= ev.width * ev.height * len(ev.getbands())
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.n_bytes = 0
+
+def _preview_fit_scale(page_w_pt: float, page_h_pt: float, canvas_w: int, canvas_h: int) -> float:
+    """Échelle qui fait tenir la page dans un canvas canvas_w × canvas_h (non quantifiée)."""
+    scale_w = (canvas_w - SIZES["canvas_pad"]) / page_w_pt
+    scale_h = (canvas_h - SIZES["canvas_pad"]) / page_h_pt
+    return max(min(scale_w, scale_h, SIZES["canvas_scale_max"]), 0.01)
+
+def _render_page_image(page, scale: float):
+    """Rastérise page à scale → image PIL RGB."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
+def _warm_preview(doc, doc_key: tuple, canvas_w: int, canvas_h: int, cache: _PreviewCache):
+    """Place dans cache le rendu de la page 0 à l'échelle du canvas ; retourne (w_pt, h_pt).
+    À appeler hors thread Tk, sous _MUPDF_LOCK.
+    """
+    page = doc[0]
+    w_pt, h_pt = page.rect.width, page.rect.height
+    scale = _quantize_scale(_preview_fit_scale(w_pt, h_pt, canvas_w, canvas_h))
+    key = doc_key + (0, scale)
+    if cache.get(key) is None:
+        cache.put(key, _render_page_image(page, scale))
+    return w_pt, h_pt
+
 # ---------------------------------------------------------------------------
 # Thème CustomTkinter
 # ---------------------------------------------------------------------------
-ctk.set_appearance_mode("dark")
-ctk.set_default_color_theme("blue")
+def _init_theme():
+    """Thème de l'interface — appelé par main() avant de créer la fenêtre (import différé de ctk)."""
+    ctk.set_appearance_mode("dark")
+    ctk.set_default_color_theme("blue")
 
 # ---------------------------------------------------------------------------
 # Application principale
 # ---------------------------------------------------------------------------
 class PDFHeaderApp:
-    def __init__(self, root, pdf_files=None):
+    def __init__(self, root, pdf_files=None, scan_folder=None):
         self.root      = root
         self.pdf_files = list(pdf_files) if pdf_files else []
+        self.scan_root = None    # dossier ouvert : sortie miroir sous <scan_root>_avec_entete/
         self.idx       = 0
+        t0 = time.perf_counter()
         self.cfg       = load_config()
+        _startup_log("config", t0)
 
         global _DEBUG_ENABLED
         _DEBUG_ENABLED = self.cfg.get("debug_enabled", False)
 
         # État courant
         self.doc           = None
+        self.doc_key       = None    # (chemin, mtime) du document ouvert — clé du cache d'aperçus
         self.tk_img        = None
+        self._preview_key  = None    # clé de l'image actuellement affichée (self.tk_img)
+        self._preview_img  = None    # dernier rendu MuPDF (PIL), ré-échantillonné pendant un resize
+        self._preview_img_scale = 1.0
+        self._resize_after_id   = None
+        self._render_retry      = False
+        self._ov               = {}       # items canvas de l'overlay (_overlay_items)
+        self._motion_xy        = None     # dernière position souris pas encore dessinée
+        self._motion_after_id  = None
+        self._ov_stats         = [0, 0.0, 0.0, time.perf_counter()]  # n, total s, max s, début
+        self._load_seq     = 0       # numéro du dernier chargement lancé (résultats périmés ignorés)
+        self._file_meta    = {}      # Path → _read_file_meta(), rempli au chargement / scan
+        self._header_text     = None # texte d'en-tête mémorisé (None = à recomposer)
+        self._header_text_key = None # (path, mtime, date du jour) pour lequel il a été composé
+        self._scan_cancel  = None    # Event du scan de dossier en cours (None = aucun)
+        self._waiting_scan = False   # file épuisée pendant le scan : attendre les prochains PDFs
+        self._pdf_info     = {}      # Path → _read_pdf_info(), affiché sur les cartes
+        self._info_pending = {}      # Path → Future en cours / en attente
+        self._info_pool    = None    # ProcessPoolExecutor créé à la première carte visible
+        self._prefetched   = None    # (path, doc, doc_key) ouvert d'avance — protégé par _MUPDF_LOCK
+        self._preview_cache = _PreviewCache(SIZES["preview_cache_mb"])
+        self._manifests     = _Manifests()   # fichiers déjà tamponnés, par dossier de sortie
+        self._report        = _SessionReport()
+        self._manifest_after_id = None
+        self._scan_load_seq = 0      # _load_seq à l'ouverture du dossier (aucun fichier affiché depuis ?)
         self.scale         = 1.0
         self.img_offset_x  = 0
         self.img_offset_y  = 0
@@ -656,29 +2353,99 @@ class PDFHeaderApp:
         # Preset de position courant
         self.preset_position = self.cfg.get("preset_position", "tr")
 
-        # Polices système disponibles (chargées avant _build_ui)
+        # Polices système disponibles (recherchées en arrière-plan après _build_ui)
         self._system_fonts = {}
-        self._load_system_fonts()
-
-        self.file_states = {}
+        self._first_load_t0 = None   # début du premier chargement (--startup-profile)
+
+        self.file_states = _FileStates()
+        # Traitement en cours (Appliquer / Appliquer à tous) — hors thread Tk
+        self._busy           = False
+        self._cancel_event   = threading.Event()
+        self._render_pending = False   # rendu différé : MuPDF n'est pas thread-safe
+        self._progress_last  = 0.0
+        self._progress_part  = None    # fichier .part sondé pendant l'enregistrement
+        t0 = time.perf_counter()
         self._build_ui()
+        self._watch_text_vars()
         self.root.update_idletasks()
+        _startup_log("ui", t0)
+        self._load_system_fonts()
+        self._check_save_profiles()
 
         global _update_staged_callback
         _update_staged_callback = lambda v: self.root.after(0, lambda: self._show_update_notice(v))
 
         if self.pdf_files:
-            self.file_states = {i: "non_traite" for i in range(len(self.pdf_files))}
+            self.file_states = _FileStates(len(self.pdf_files))
+            self._mark_unchanged_files()
             self._populate_file_panel()
             self._load_pdf()
         else:
             self._show_welcome_screen()
+            if scan_folder is not None:
+                self._start_folder_scan(Path(scan_folder))
+            # Rien à afficher : PyMuPDF / Pillow se chargent pendant le choix des fichiers
+            threading.Thread(target=_warm_imports, daemon=True).start()
 
     # ---------------------------------------------------------------- Fonts ---
 
     def _load_system_fonts(self):
-        """Charge les polices système prioritaires disponibles."""
-        self._system_fonts = _find_priority_fonts()
+        """Polices système dans un thread : le menu est d'abord rempli depuis l'index
+        sur disque, puis mis à jour si le parcours des dossiers trouve des changements."""
+        def _run():
+            global _FONT_FAMILIES
+            t0 = time.perf_counter()
+            dirs = _load_font_index()
+            if dirs:
+                families = _font_families_from_index(dirs)
+                _startup_log("fonts (index)", t0)
+                self.root.after(0, lambda: self._on_system_fonts(_system_font_menu(families), False))
+            t0 = time.perf_counter()
+            dirs, changed = _refresh_font_index(dirs)
+            families = _font_families_from_index(dirs)
+            _FONT_FAMILIES = families
+            _startup_log("fonts (scan)", t0)
+            _debug_log(f"FONTS {len(families)} famille(s), {len(dirs)} dossier(s), "
+                       f"index {'mis à jour' if changed else 'inchangé'} "
+                       f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+            self.root.after(0, lambda: self._on_system_fonts(_system_font_menu(families), True))
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_system_fonts(self, fonts: dict, final: bool):
+        """Thread Tk : complète le menu des polices. Après le parcours (final), une police
+        système mémorisée mais introuvable retombe sur Courier."""
+        self._system_fonts = fonts
+        self._refresh_font_menu()
+        current = self.var_font_family.get()
+        if final and current not in BUILTIN_FONTS and current not in fonts:
+            self.var_font_family.set("Courier")
+            self._on_font_change("Courier")
+
+    # ------------------------------------------------------ Profils de sauvegarde ---
+
+    def _check_save_profiles(self):
+        """Teste dans un thread si ce MuPDF sait linéariser (profil web) : l'essai
+        charge PyMuPDF, à ne pas faire sur le thread Tk au démarrage."""
+        def _run():
+            with _MUPDF_LOCK:
+                supported = _web_profile_supported()
+            self.root.after(0, lambda: self._on_save_profiles_checked(supported))
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_save_profiles_checked(self, web_supported: bool):
+        """Thread Tk : sans linéarisation, "Web (linéarisé)" est retiré du menu ; s'il
+        était le profil mémorisé, Compact est sélectionné et le repli affiché."""
+        if web_supported:
+            return
+        web = SAVE_PROFILE_DISPLAY["web"]
+        self.opt_save_profile.configure(
+            values=[label for label in SAVE_PROFILE_DISPLAY.values() if label != web])
+        if self.var_save_profile.get() == web:
+            self.var_save_profile.set(SAVE_PROFILE_DISPLAY["compact"])
+            self.lbl_save_profile_note.configure(
+                text=f"{web} indisponible avec MuPDF {fitz.VersionBind} — profil Compact utilisé.")
+            self.lbl_save_profile_note.pack(fill="x", padx=14, pady=(0, 4),
+                                            after=self._save_profile_row)
 
     # ------------------------------------------------------------------ UI ---
 
@@ -739,6 +2506,25 @@ class PDFHeaderApp:
         sidebar_scroll.pack(fill="both", expand=True)
         self._build_sidebar(sidebar_scroll)
 
+        # Progression + Annuler : bas de la sidebar, hors zone scrollable, visible en traitement
+        self._progress_frame = ctk.CTkFrame(sidebar_outer, fg_color=COLORS["bg_grid"], corner_radius=0)
+        self.lbl_job = ctk.CTkLabel(self._progress_frame, text="",
+                                    fg_color="transparent", text_color=COLORS["text_secondary"],
+                                    font=("Segoe UI", 11), anchor="w", justify="left",
+                                    wraplength=SIZES["preview_wrap"])
+        self.lbl_job.pack(fill="x", padx=14, pady=(8, 2))
+        self.progress_bar = ctk.CTkProgressBar(self._progress_frame, height=8,
+                                               progress_color=COLORS["accent_green"])
+        self.progress_bar.set(0)
+        self.progress_bar.pack(fill="x", padx=14, pady=2)
+        self.btn_cancel = ctk.CTkButton(self._progress_frame, text="✕  Annuler",
+                                        fg_color=COLORS["card_error_bg"], text_color=COLORS["text_primary"],
+                                        hover_color=COLORS["error_red"],
+                                        font=("Segoe UI", 11),
+                                        command=self._cancel_processing)
+        self.btn_cancel.pack(fill="x", padx=14, pady=(4, 10))
+        self._sidebar_scroll = sidebar_scroll
+
         # ── Panneau fichiers (droit) ──
         self.file_panel = ctk.CTkFrame(body, fg_color=COLORS["bg_file_panel"], width=SIZES["file_panel_w"], corner_radius=0)
         self.file_panel.pack(side="right", fill="y")
@@ -762,7 +2548,7 @@ class PDFHeaderApp:
         self.canvas.pack(fill="both", expand=True)
         self.canvas.bind("<Button-1>", self._on_click)
         self.canvas.bind("<Motion>",   self._on_motion)
-        self.canvas.bind("<Configure>", lambda e: self._render_preview())
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
 
         # ── Bottombar ──
         bottom = ctk.CTkFrame(self.root, fg_color=COLORS["bg_topbar"], height=SIZES["bottombar_h"], corner_radius=0)
@@ -788,6 +2574,13 @@ class PDFHeaderApp:
                                  command=self._skip)
         self.btn_skip.pack(side="right", padx=4, pady=8)
 
+        self.btn_apply_all = ctk.CTkButton(bottom, text="⇶  Appliquer à tous",
+                                      fg_color=COLORS["input_bg"], text_color=COLORS["text_secondary"],
+                                      hover_color=COLORS["input_border"],
+                                      font=("Segoe UI", 11),
+                                      command=self._apply_all)
+        self.btn_apply_all.pack(side="right", padx=4, pady=8)
+
     def _section(self, parent, label):
         """Séparateur de section dans la sidebar."""
         ctk.CTkLabel(parent, text=label,
@@ -947,12 +2740,14 @@ class PDFHeaderApp:
         row_font.pack(fill="x", padx=14, pady=(6, 2))
         ctk.CTkLabel(row_font, text="Police", fg_color="transparent", text_color=COLORS["text_secondary"],
                      font=("Segoe UI", 11), width=52, anchor="w").pack(side="left")
-        all_font_names = list(BUILTIN_FONTS.keys()) + list(self._system_fonts.keys())
         current_family = cfg.get("font_family", "Courier")
-        if current_family not in all_font_names:
+        if current_family not in BUILTIN_FONTS and not cfg.get("font_file"):
             current_family = "Courier"
+        # Police système : la liste complète arrive avec _on_system_fonts()
         self.var_font_family = tk.StringVar(value=current_family)
-        opt_font = ctk.CTkOptionMenu(row_font, values=all_font_names,
+        self.entry_font_search = None
+        self._font_family_current = current_family   # rétabli si une entrée non-police est choisie
+        self.opt_font = opt_font = ctk.CTkOptionMenu(row_font, values=self._font_menu_values(),
                                      variable=self.var_font_family,
                                      fg_color=COLORS["input_bg"], button_color=COLORS["input_border"],
                                      button_hover_color=COLORS["input_hover"], text_color=COLORS["text_primary"],
@@ -961,6 +2756,23 @@ class PDFHeaderApp:
         opt_font.pack(side="left", padx=4)
         self._sidebar_interactive.append(opt_font)
 
+        # Recherche : filtre le menu des polices (des centaines de familles système)
+        row_font_search = ctk.CTkFrame(parent, fg_color="transparent")
+        row_font_search.pack(fill="x", padx=14, pady=(0, 2))
+        ctk.CTkLabel(row_font_search, text="", fg_color="transparent",
+                     width=52).pack(side="left")
+        # Sans textvariable : CTk n'affiche le placeholder que dans ce cas
+        font_search = ctk.CTkEntry(row_font_search,
+                                   placeholder_text="Rechercher une police…",
+                                   placeholder_text_color=COLORS["text_placeholder"],
+                                   fg_color=COLORS["input_bg"], text_color=COLORS["text_primary"],
+                                   border_color=COLORS["input_border"], font=("Segoe UI", 11),
+                                   width=SIZES["menu_font_w"])
+        font_search.pack(side="left", padx=4)
+        font_search.bind("<KeyRelease>", lambda _: self._refresh_font_menu())
+        self._sidebar_interactive.append(font_search)
+        self.entry_font_search = font_search
+
         # Taille
         size_row = ctk.CTkFrame(parent, fg_color="transparent")
         size_row.pack(fill="x", padx=14, pady=4)
@@ -1255,6 +3067,40 @@ class PDFHeaderApp:
             rb.pack(anchor="w", pady=2)
             self._sidebar_interactive.append(rb)
 
+        self.var_shared_stamp = tk.BooleanVar(value=cfg.get("shared_stamp", False))
+        cb_shared = ctk.CTkCheckBox(parent, text="Tampon partagé (gros fichiers)",
+                                    variable=self.var_shared_stamp,
+                                    text_color=COLORS["text_primary"], font=("Segoe UI", 12))
+        cb_shared.pack(anchor="w", padx=14, pady=(2, 4))
+        self._sidebar_interactive.append(cb_shared)
+
+        # ═══════════════════════════════════════════════════════════════
+        # SAUVEGARDE
+        # ═══════════════════════════════════════════════════════════════
+        self._section(parent, "SAUVEGARDE")
+
+        row_sp = ctk.CTkFrame(parent, fg_color="transparent")
+        row_sp.pack(fill="x", padx=14, pady=(6, 4))
+        ctk.CTkLabel(row_sp, text="Profil", fg_color="transparent", text_color=COLORS["text_secondary"],
+                     font=("Segoe UI", 11), width=52, anchor="w").pack(side="left")
+        _sp_display = SAVE_PROFILE_DISPLAY.get(cfg.get("save_profile", "compact"),
+                                               SAVE_PROFILE_DISPLAY["compact"])
+        self.var_save_profile = tk.StringVar(value=_sp_display)
+        opt_sp = ctk.CTkOptionMenu(row_sp, values=list(SAVE_PROFILE_DISPLAY.values()),
+                                   variable=self.var_save_profile,
+                                   fg_color=COLORS["input_bg"], button_color=COLORS["input_border"],
+                                   button_hover_color=COLORS["input_hover"], text_color=COLORS["text_primary"],
+                                   font=("Segoe UI", 11), width=155)
+        opt_sp.pack(side="left", padx=4)
+        self._sidebar_interactive.append(opt_sp)
+        self.opt_save_profile = opt_sp
+        # Repli du profil web signalé ici (packé par _on_save_profiles_checked)
+        self.lbl_save_profile_note = ctk.CTkLabel(parent, text="", fg_color="transparent",
+                                                  text_color=COLORS["error_red"],
+                                                  font=("Segoe UI", 10), wraplength=230,
+                                                  justify="left", anchor="w")
+        self._save_profile_row = row_sp
+
         # ═══════════════════════════════════════════════════════════════
         # APERÇU
         # ═══════════════════════════════════════════════════════════════
@@ -1284,13 +3130,21 @@ class PDFHeaderApp:
         ctk.CTkFrame(parent, fg_color=COLORS["input_border"], height=1,
                      corner_radius=0).pack(fill="x", padx=10)
 
-        self.file_cards_scroll = ctk.CTkScrollableFrame(
-            parent, fg_color=COLORS["bg_file_panel"], corner_radius=0
-        )
-        self.file_cards_scroll.pack(fill="both", expand=True)
-
-        self.file_card_frames = {}
-        self.file_card_badges = {}
+        # Liste virtualisée : seules les cartes visibles existent, recyclées au défilement
+        list_frame = ctk.CTkFrame(parent, fg_color=COLORS["bg_file_panel"], corner_radius=0)
+        list_frame.pack(fill="both", expand=True)
+        self.file_list_scrollbar = ctk.CTkScrollbar(list_frame, command=self._on_file_list_scroll,
+                                                    button_color=COLORS["input_border"],
+                                                    button_hover_color=COLORS["input_hover"])
+        self.file_list_scrollbar.pack(side="right", fill="y")
+        self.file_list_view = ctk.CTkFrame(list_frame, fg_color=COLORS["bg_file_panel"], corner_radius=0)
+        self.file_list_view.pack(side="left", fill="both", expand=True, padx=(6, 0))
+        self.file_list_view.bind("<Configure>", lambda e: self._layout_file_rows())
+        self._bind_file_list_wheel(self.file_list_view)
+
+        self._file_rows     = []   # [(frame, name_lbl, badge_lbl)] par emplacement visible
+        self._file_row_sig  = []   # (idx, état, courant) affiché par emplacement, None si libre
+        self._file_list_top = 0.0  # défilement (unités CTk, avant mise à l'échelle)
 
         self.lbl_file_counter = ctk.CTkLabel(
             parent, text="0 / 0 fichiers traités",
@@ -1300,78 +3154,225 @@ class PDFHeaderApp:
         self.lbl_file_counter.pack(fill="x", pady=4)
 
     def _populate_file_panel(self):
-        for frame in self.file_card_frames.values():
-            frame.destroy()
-        self.file_card_frames = {}
-        self.file_card_badges = {}
-        for i, path in enumerate(self.pdf_files):
-            self._create_file_card(i, path)
+        """Nouvelle liste de fichiers : retour en haut, cartes repeintes au layout."""
+        self._file_list_top = 0.0
+        self._file_row_sig  = [None] * len(self._file_rows)
+        self._layout_file_rows()
         self._refresh_file_counter()
 
-    def _create_file_card(self, idx, path):
-        frame = ctk.CTkFrame(self.file_cards_scroll,
+    def _create_file_row(self):
+        """Ajoute un emplacement de carte au pool ; son contenu suit l'index affiché."""
+        slot  = len(self._file_rows)
+        click = lambda e, s=slot: self._on_file_row_click(s)
+        frame = ctk.CTkFrame(self.file_list_view, height=SIZES["card_h"],
                              fg_color=COLORS["input_bg"], corner_radius=6)
-        frame.pack(fill="x", padx=6, pady=3)
-        frame.bind("<Button-1>", lambda e, i=idx: self._jump_to_file(i))
+        frame.pack_propagate(False)
+        frame.bind("<Button-1>", click)
 
-        name_lbl = ctk.CTkLabel(frame, text=path.stem,
+        name_lbl = ctk.CTkLabel(frame, text="", height=22,
                                  fg_color="transparent", text_color=COLORS["text_primary"],
-                                 font=("Segoe UI", 12), anchor="w",
-                                 wraplength=180)
-        name_lbl.pack(anchor="w", padx=8, pady=(6, 0))
-        name_lbl.bind("<Button-1>", lambda e, i=idx: self._jump_to_file(i))
+                                 font=("Segoe UI", 12), anchor="w")
+        name_lbl.pack(fill="x", padx=8, pady=(6, 0))
+        name_lbl.bind("<Button-1>", click)
 
-        badge_lbl = ctk.CTkLabel(frame, text="",
+        badge_lbl = ctk.CTkLabel(frame, text="", height=18,
                                   fg_color="transparent", text_color=COLORS["text_tertiary"],
                                   font=("Segoe UI", 10), anchor="w")
-        badge_lbl.pack(anchor="w", padx=8, pady=(0, 6))
-        badge_lbl.bind("<Button-1>", lambda e, i=idx: self._jump_to_file(i))
+        badge_lbl.pack(fill="x", padx=8, pady=(0, 6))
+        badge_lbl.bind("<Button-1>", click)
+
+        for w in (frame, name_lbl, badge_lbl):
+            self._bind_file_list_wheel(w)
+        self._file_rows.append((frame, name_lbl, badge_lbl))
+        self._file_row_sig.append(None)
+
+    def _file_list_geometry(self):
+        """(pas entre cartes, hauteur visible, hauteur totale) en unités CTk."""
+        pitch  = SIZES["card_h"] + SIZES["card_gap"]
+        scaling = ctk.ScalingTracker.get_widget_scaling(self.file_list_view)   # API publique CTk
+        view_h = max(self.file_list_view.winfo_height(), 1) / scaling
+        return pitch, view_h, len(self.pdf_files) * pitch
+
+    def _layout_file_rows(self):
+        """Place les emplacements sur les cartes visibles et repeint celles qui ont changé."""
+        pitch, view_h, total_h = self._file_list_geometry()
+        self._file_list_top = max(0.0, min(self._file_list_top, total_h - view_h))
+        n      = len(self.pdf_files)
+        needed = min(n, int(view_h // pitch) + 2)
+        while len(self._file_rows) < needed:
+            self._create_file_row()
+
+        first = int(self._file_list_top // pitch)
+        for slot, (frame, _name, _badge) in enumerate(self._file_rows):
+            idx = first + slot
+            if slot < needed and idx < n:
+                frame.place(x=0, y=idx * pitch - self._file_list_top, relwidth=1.0)
+                self._paint_file_row(slot, idx)
+            else:
+                frame.place_forget()
+                self._file_row_sig[slot] = None
+        self._prune_info_requests()
 
-        self.file_card_frames[idx] = frame
-        self.file_card_badges[idx] = badge_lbl
+        if total_h > view_h:
+            self.file_list_scrollbar.set(self._file_list_top / total_h,
+                                         (self._file_list_top + view_h) / total_h)
+        else:
+            self.file_list_scrollbar.set(0.0, 1.0)
 
-    def _refresh_card(self, idx):
-        if idx not in self.file_card_frames:
-            return
-        frame = self.file_card_frames[idx]
-        badge = self.file_card_badges[idx]
+    def _paint_file_row(self, slot, idx):
+        """Met la carte de l'emplacement slot aux couleurs de idx, si elle a changé."""
         state = self.file_states.get(idx, "non_traite")
+        info  = self._pdf_info.get(self.pdf_files[idx])
+        sig   = (idx, state, idx == self.idx, info is not None)
+        old   = self._file_row_sig[slot]
+        if old == sig:
+            return
+        if info is None:
+            self._request_pdf_info(self.pdf_files[idx])
+        self._file_row_sig[slot] = sig
+        frame, name_lbl, badge = self._file_rows[slot]
+        if old is None or old[0] != idx:
+            name = self.pdf_files[idx].stem
+            if len(name) > SIZES["card_name_chars"]:
+                name = name[:SIZES["card_name_chars"] - 1] + "…"
+            name_lbl.configure(text=name)
 
         if idx == self.idx:
-            frame.configure(fg_color=COLORS["card_active_bg"])
-            badge.configure(text="▶ En cours", text_color=COLORS["accent_blue"])
+            bg, label, fg = COLORS["card_active_bg"], "▶ En cours", COLORS["accent_blue"]
         elif state == "traite":
-            frame.configure(fg_color=COLORS["card_done_bg"])
-            badge.configure(text="✓ Modifié", text_color=COLORS["accent_green"])
+            bg, label, fg = COLORS["card_done_bg"], "✓ Modifié", COLORS["accent_green"]
         elif state == "passe":
-            frame.configure(fg_color=COLORS["card_passe_bg"])
-            badge.configure(text="→ Ignoré", text_color=COLORS["text_unit"])
+            bg, label, fg = COLORS["card_passe_bg"], "→ Ignoré", COLORS["text_unit"]
         elif state == "erreur":
-            frame.configure(fg_color=COLORS["card_error_bg"])
-            badge.configure(text="⚠ Erreur", text_color=COLORS["error_red"])
+            bg, label, fg = COLORS["card_error_bg"], "⚠ Erreur", COLORS["error_red"]
         else:
-            frame.configure(fg_color=COLORS["input_bg"])
-            badge.configure(text="", text_color=COLORS["text_tertiary"])
+            bg, label, fg = COLORS["input_bg"], "", COLORS["text_tertiary"]
+        if info is not None:
+            label = " · ".join(s for s in (label, _info_summary(info)) if s)
+        frame.configure(fg_color=bg)
+        badge.configure(text=label, text_color=fg)
+
+    # ------------------------------------------------- Infos des cartes ---
+
+    def _request_pdf_info(self, path: Path):
+        """Demande pages / format / chiffrement de path au pool d'infos (une fois)."""
+        if path in self._info_pending:
+            return
+        if self._info_pool is None:
+            workers = max(1, int(self.cfg.get("info_workers", 2)))
+            self._info_pool = ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=multiprocessing.get_context("spawn"),
+                                                  initializer=_init_pool_worker,
+                                                  initargs=(_DEBUG_ENABLED,))
+        fut = self._info_pool.submit(_read_pdf_info, str(path))
+        self._info_pending[path] = fut
+        fut.add_done_callback(lambda f, p=path: self._post_pdf_info(p, f))
+
+    def _post_pdf_info(self, path: Path, fut):
+        """Callback du Future (thread du pool) : relaie le résultat vers Tk."""
+        if fut.cancelled():
+            return
+        try:
+            info = fut.result()
+        except Exception as e:  # BrokenProcessPool
+            info = {"error": str(e) or type(e).__name__}
+        try:
+            self.root.after(0, lambda: self._on_pdf_info(path, fut, info))
+        except (RuntimeError, tk.TclError):
+            pass    # fenêtre fermée
+
+    def _on_pdf_info(self, path: Path, fut, info: dict):
+        if self._info_pending.get(path) is fut:
+            del self._info_pending[path]
+        self._pdf_info[path] = info
+        for slot, sig in enumerate(self._file_row_sig):
+            if sig is not None and self.pdf_files[sig[0]] == path:
+                self._paint_file_row(slot, sig[0])
+
+    def _prune_info_requests(self):
+        """Annule les demandes d'infos pas encore démarrées des cartes sorties de l'écran."""
+        if not self._info_pending:
+            return
+        visible = {self.pdf_files[sig[0]] for sig in self._file_row_sig if sig is not None}
+        for path, fut in list(self._info_pending.items()):
+            if path not in visible and fut.cancel():
+                del self._info_pending[path]
+
+    def shutdown(self):
+        """Fin de session : config et manifestes écrits, arrêt du pool d'infos sans
+        attendre les demandes en file."""
+        _CONFIG_STORE.flush()
+        self._manifests.flush()
+        self._report.close()
+        if self._info_pool is not None:
+            self._info_pool.shutdown(wait=False, cancel_futures=True)
+            self._info_pool = None
+
+    def _refresh_card(self, idx):
+        """Repeint la carte de idx si elle est visible (sinon elle le sera au défilement)."""
+        slot = idx - int(self._file_list_top // (SIZES["card_h"] + SIZES["card_gap"]))
+        if 0 <= slot < len(self._file_rows) and self._file_row_sig[slot] is not None:
+            self._paint_file_row(slot, idx)
 
     def _refresh_all_cards(self):
-        for i in range(len(self.pdf_files)):
-            self._refresh_card(i)
+        for slot, sig in enumerate(self._file_row_sig):
+            if sig is not None:
+                self._paint_file_row(slot, sig[0])
         self._refresh_file_counter()
 
+    def _scroll_file_list_to(self, idx):
+        """Fait défiler la liste juste assez pour que la carte idx soit visible."""
+        pitch, view_h, _ = self._file_list_geometry()
+        y = idx * pitch
+        if y < self._file_list_top:
+            self._file_list_top = y
+        elif y + pitch > self._file_list_top + view_h:
+            self._file_list_top = y + pitch - view_h
+        else:
+            return
+        self._layout_file_rows()
+
+    def _on_file_list_scroll(self, action, *args):
+        """Commande de la scrollbar : ("moveto", fraction) ou ("scroll", n, "units"|"pages")."""
+        pitch, view_h, total_h = self._file_list_geometry()
+        if action == "moveto":
+            self._file_list_top = float(args[0]) * total_h
+        elif action == "scroll":
+            step = pitch if args[1] == "units" else view_h
+            self._file_list_top += int(args[0]) * step
+        self._layout_file_rows()
+
+    def _bind_file_list_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_file_list_wheel)   # Windows / macOS
+        widget.bind("<Button-4>",   self._on_file_list_wheel)   # Linux (X11)
+        widget.bind("<Button-5>",   self._on_file_list_wheel)
+
+    def _on_file_list_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            direction = -1
+        else:
+            direction = 1
+        self._on_file_list_scroll("scroll", direction * SIZES["card_wheel_rows"], "units")
+
+    def _on_file_row_click(self, slot):
+        sig = self._file_row_sig[slot]
+        if sig is not None:
+            self._jump_to_file(sig[0])
+
     def _refresh_file_counter(self):
-        done = sum(1 for s in self.file_states.values() if s in ("traite", "passe"))
+        done = self.file_states.count("traite", "passe")
         total = len(self.pdf_files)
-        self.lbl_file_counter.configure(text=f"{done} / {total} fichiers traités")
+        scanning = "  (analyse…)" if self._scan_cancel is not None else ""
+        self.lbl_file_counter.configure(text=f"{done} / {total} fichiers traités{scanning}")
 
     def _find_next_untreated(self):
-        n = len(self.pdf_files)
-        for offset in range(1, n):
-            i = (self.idx + offset) % n
-            if self.file_states.get(i, "non_traite") == "non_traite":
-                return i
-        return None
+        return self.file_states.next_untreated(self.idx)
 
     def _jump_to_file(self, idx):
+        if self._busy:
+            return
+        if self._waiting_scan:
+            self._stop_waiting_scan()
         self.idx = idx
         self._load_pdf()
 
@@ -1407,8 +3408,18 @@ class PDFHeaderApp:
                       text_color=COLORS["accent_blue"], font=("Segoe UI", 12),
                       command=self._open_folder).pack(side="left", padx=16)
 
+        self.var_scan_recursive = tk.BooleanVar(value=self.cfg.get("scan_recursive", False))
+        ctk.CTkCheckBox(self.welcome_frame, text="Inclure les sous-dossiers",
+                        variable=self.var_scan_recursive,
+                        text_color=COLORS["text_secondary"], font=("Segoe UI", 11),
+                        command=self._on_scan_recursive_toggle).pack(pady=(24, 0))
+
         self._set_ui_state(False)
 
+    def _on_scan_recursive_toggle(self):
+        self.cfg["scan_recursive"] = self.var_scan_recursive.get()
+        save_config(self.cfg)
+
     def _hide_welcome_screen(self):
         if hasattr(self, "welcome_frame") and self.welcome_frame.winfo_exists():
             self.welcome_frame.destroy()
@@ -1416,14 +3427,25 @@ class PDFHeaderApp:
 
     def _set_ui_state(self, enabled: bool):
         state = "normal" if enabled else "disabled"
-        self.btn_apply.configure(state=state)
-        self.btn_skip.configure(state=state)
+        self._set_action_state(enabled)
         for w in self._sidebar_interactive:
             try:
                 w.configure(state=state)
             except Exception:
                 pass
 
+    def _set_action_state(self, enabled: bool):
+        """Boutons Appliquer / Passer / Appliquer à tous seuls (la sidebar reste active,
+        ex. pendant l'attente de la suite d'un scan)."""
+        state = "normal" if enabled else "disabled"
+        self.btn_apply.configure(state=state)
+        self.btn_skip.configure(state=state)
+        self.btn_apply_all.configure(state=state)
+
+    def _stop_waiting_scan(self):
+        self._waiting_scan = False
+        self._set_action_state(True)
+
     def _open_files(self):
         paths = filedialog.askopenfilenames(
             title="Sélectionner des fichiers PDF",
@@ -1432,25 +3454,118 @@ class PDFHeaderApp:
         if not paths:
             return
         self.pdf_files = [Path(p) for p in paths]
-        self.file_states = {i: "non_traite" for i in range(len(self.pdf_files))}
-        self.idx = 0
+        self.scan_root = None
+        self.file_states = _FileStates(len(self.pdf_files))
+        self._mark_unchanged_files()
         self._populate_file_panel()
         self._hide_welcome_screen()
         self._load_pdf()
 
+    def _mark_unchanged_files(self):
+        """Liste de fichiers explicite : ceux que le manifeste de sortie donne à jour sont
+        marqués traités ; self.idx = premier fichier restant (0 si tous sont à jour)."""
+        digest = _settings_digest(self._collect_settings())
+        for i, path in enumerate(self.pdf_files):
+            meta = self._meta_for(path)
+            if meta is not None and self._manifests.is_current(path, meta, None, digest):
+                self.file_states[i] = "traite"
+        next_idx = self.file_states.next_untreated(-1)
+        self.idx = 0 if next_idx is None else next_idx
+
+    def _record_manifest(self, path: Path, meta, digest: str, stats):
+        """Thread Tk : note un fichier tamponné ; manifestes écrits en différé."""
+        if meta is None or not stats:
+            return
+        self._manifests.record(path, meta, self.scan_root, digest, stats["bytes_out"])
+        if self._manifest_after_id is None:
+            self._manifest_after_id = self.root.after(TIMINGS["manifest_flush_ms"],
+                                                      self._flush_manifests)
+
+    def _flush_manifests(self):
+        self._manifest_after_id = None
+        self._manifests.flush()
+
     def _open_folder(self):
         folder = filedialog.askdirectory(title="Sélectionner le dossier contenant les PDFs")
         if not folder:
             return
-        self.pdf_files = sorted(Path(folder).glob("*.pdf"))
-        if not self.pdf_files:
-            messagebox.showwarning("Aucun fichier", "Aucun fichier PDF trouvé dans ce dossier.")
-            return
-        self.file_states = {i: "non_traite" for i in range(len(self.pdf_files))}
+        self._start_folder_scan(Path(folder))
+
+    def _start_folder_scan(self, folder: Path):
+        """Parcourt folder dans un thread (_scan_pdfs) ; les PDFs trouvés sont ajoutés
+        au panneau par lots (_on_scan_batch) et le premier s'affiche dès qu'il arrive."""
+        if self._scan_cancel is not None:
+            self._scan_cancel.set()
+        cancel = self._scan_cancel = threading.Event()
+        recursive = self.cfg.get("scan_recursive", False)
+        digest    = _settings_digest(self._collect_settings())
+        manifests = self._manifests
+        self.scan_root   = folder
+        self.pdf_files   = []
+        self.file_states = _FileStates()
         self.idx = 0
+        self._waiting_scan  = True     # premier fichier non traité affiché dès qu'il arrive
+        self._scan_load_seq = self._load_seq
         self._populate_file_panel()
-        self._hide_welcome_screen()
-        self._load_pdf()
+
+        def _run():
+            t0 = time.perf_counter()
+            batch, last, n = [], time.monotonic(), 0
+            for path, meta in _scan_pdfs(folder, recursive, cancel):
+                batch.append((path, meta, manifests.is_current(path, meta, folder, digest)))
+                n += 1
+                now = time.monotonic()
+                # Premier PDF envoyé tout de suite, puis par lots
+                if n == 1 or len(batch) >= SIZES["scan_batch"] or \
+                        (now - last) * 1000 >= TIMINGS["scan_flush_ms"]:
+                    self.root.after(0, lambda b=batch: self._on_scan_batch(cancel, b))
+                    batch, last = [], now
+            _debug_log(f"SCAN [{folder}] recursif={recursive} {n} PDF en "
+                       f"{time.perf_counter() - t0:.2f} s")
+            self.root.after(0, lambda b=batch: self._on_scan_batch(cancel, b, done=True))
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_scan_batch(self, cancel, batch: list, done: bool = False):
+        if cancel is not self._scan_cancel:
+            return      # scan remplacé par l'ouverture d'un autre dossier
+        start = len(self.pdf_files)
+        self.file_states.extend(len(batch))
+        for idx, (path, meta, unchanged) in enumerate(batch, start):
+            self._file_meta[path] = meta
+            self.pdf_files.append(path)
+            if unchanged:
+                self.file_states[idx] = "traite"
+        if done:
+            self._scan_cancel = None
+        self._layout_file_rows()
+        self._refresh_file_counter()
+
+        if start == 0 and self.pdf_files:
+            self._hide_welcome_screen()
+        if not self._waiting_scan:
+            return
+        next_idx = self.file_states.next_untreated(start - 1) if len(self.pdf_files) > start else None
+        if next_idx is not None:
+            self._stop_waiting_scan()
+            self.idx = next_idx
+            self._load_pdf()
+        elif not done:
+            if start == 0 and self.pdf_files:
+                self._set_action_state(False)
+                self._show_canvas_message("Analyse du dossier en cours…")
+        elif not self.pdf_files:
+            self._stop_waiting_scan()
+            messagebox.showwarning("Aucun fichier", "Aucun fichier PDF trouvé dans ce dossier.")
+        elif self._load_seq == self._scan_load_seq:
+            # Dossier entièrement à jour d'après le manifeste : premier fichier affiché
+            self._stop_waiting_scan()
+            self.idx = 0
+            self._load_pdf()
+            messagebox.showinfo("Dossier à jour",
+                f"Les {len(self.pdf_files)} PDF(s) de ce dossier sont déjà traités avec ces réglages.")
+        else:
+            self._finish_session()
 
     # ------------------------------------------- Callbacks sidebar texte ---
 
@@ -1512,7 +3627,28 @@ class PDFHeaderApp:
             pass
         self._draw_overlay()
 
+    def _font_menu_values(self) -> list:
+        """Entrées du menu police : polices intégrées puis familles système (prioritaires
+        d'abord) contenant la recherche, au plus SIZES["font_menu_max"]. Le reste est
+        résumé par une dernière entrée « … N autres » qui invite à affiner."""
+        query = self.entry_font_search.get().strip().lower() if self.entry_font_search else ""
+        values = [name for name in BUILTIN_FONTS if query in name.lower()]
+        system = [name for name in self._system_fonts if query in name.lower()]
+        room = max(SIZES["font_menu_max"] - len(values), 0)
+        values += system[:room]
+        if len(system) > room:
+            values.append(f"… {len(system) - room} autres — affiner la recherche")
+        return values or ["(aucune police)"]
+
+    def _refresh_font_menu(self):
+        self.opt_font.configure(values=self._font_menu_values())
+
     def _on_font_change(self, font_name: str):
+        if font_name not in BUILTIN_FONTS and font_name not in self._system_fonts:
+            # Entrée « … N autres » / « (aucune police) » : la police courante est conservée
+            self.var_font_family.set(self._font_family_current)
+            return
+        self._font_family_current = font_name
         if font_name in self._system_fonts:
             self.cfg["font_file"] = str(self._system_fonts[font_name])
         else:
@@ -1564,32 +3700,14 @@ class PDFHeaderApp:
 
     def _recalc_ratio_from_preset(self):
         """Recalcule pos_ratio_x/y depuis le preset actif et les marges."""
-        if self.preset_position == "custom":
-            return
-        if self.preset_position not in POSITION_PRESETS:
-            return
         try:
             mx = float(self.var_margin_x.get())
             my = float(self.var_margin_y.get())
         except (ValueError, AttributeError):
             mx, my = 20.0, 20.0
-        pw = max(self.page_w_pt, 1.0)
-        ph = max(self.page_h_pt, 1.0)
-        row_n, col_n = POSITION_PRESETS[self.preset_position]
-        if col_n == 0:
-            rx = mx / pw
-        elif col_n == 1:
-            rx = 0.5
-        else:
-            rx = 1.0 - mx / pw
-        if row_n == 0:
-            ry = my / ph
-        elif row_n == 1:
-            ry = 0.5
-        else:
-            ry = 1.0 - my / ph
-        self.pos_ratio_x = max(SIZES["pos_ratio_min"], min(SIZES["pos_ratio_max"], rx))
-        self.pos_ratio_y = max(SIZES["pos_ratio_min"], min(SIZES["pos_ratio_max"], ry))
+        ratio = _ratio_from_preset(self.preset_position, mx, my, self.page_w_pt, self.page_h_pt)
+        if ratio is not None:
+            self.pos_ratio_x, self.pos_ratio_y = ratio
 
     def _on_margins_change(self, *_):
         """Recalcule la position si on est en mode preset."""
@@ -1611,129 +3729,376 @@ class PDFHeaderApp:
     # ----------------------------------------------- Composition du texte ---
 
     def _get_header_text(self) -> str:
-        """Assemble le texte d'en-tête selon les options actives."""
-        # Base
-        if self.var_use_custom.get():
-            base = self.var_custom_text.get().strip()
-        elif self.var_use_filename.get():
-            if self.pdf_files and self.idx < len(self.pdf_files):
-                base = self.pdf_files[self.idx].stem
-            else:
-                base = "fichier"
-        else:
-            base = ""
-
-        # Date
-        date_str = ""
-        if self.var_use_date.get():
-            fmt    = self.var_date_format.get() or "%d/%m/%Y"
-            source = DATE_SOURCE_INTERNAL.get(self.var_date_source.get(), "today")
-            if source == "file_mtime" and self.pdf_files and self.idx < len(self.pdf_files):
-                try:
-                    mtime = self.pdf_files[self.idx].stat().st_mtime
-                    dt    = datetime.datetime.fromtimestamp(mtime)
-                except Exception:
-                    dt = datetime.datetime.today()
-            else:
-                dt = datetime.datetime.today()
+        """Texte d'en-tête du fichier courant, recomposé seulement si une option de texte
+        (_watch_text_vars), le fichier, sa date de modification (_file_meta rafraîchi par
+        le chargement) ou la date du jour a changé."""
+        path = self.pdf_files[self.idx] if self.pdf_files and self.idx < len(self.pdf_files) else None
+        meta = self._meta_for(path)
+        key = (path, meta["mtime"] if meta else None, datetime.date.today())
+        if self._header_text is None or key != self._header_text_key:
+            self._header_text = _compose_header_text(self._collect_text_options(), path, meta)
+            self._header_text_key = key
+        return self._header_text
+
+    def _meta_for(self, path):
+        """Métadonnées mémorisées de path ; un seul stat() par fichier (None si illisible)."""
+        if path is None:
+            return None
+        meta = self._file_meta.get(path)
+        if meta is None:
             try:
-                date_str = dt.strftime(fmt)
-            except Exception:
-                date_str = dt.strftime("%d/%m/%Y")
-
-        # Assemblage
-        prefix_parts = []
-        if date_str and self.var_date_position.get() == "prefix":
-            prefix_parts.append(date_str)
-        if self.var_use_prefix.get():
-            pfx = self.var_prefix_text.get().strip()
-            if pfx:
-                prefix_parts.append(pfx)
-
-        suffix_parts = []
-        if self.var_use_suffix.get():
-            sfx = self.var_suffix_text.get().strip()
-            if sfx:
-                suffix_parts.append(sfx)
-        if date_str and self.var_date_position.get() == "suffix":
-            suffix_parts.append(date_str)
-
-        parts = prefix_parts + ([base] if base else []) + suffix_parts
-        return " ".join(parts).strip()
+                meta = self._file_meta[path] = _read_file_meta(path)
+            except OSError:
+                return None
+        return meta
+
+    def _watch_text_vars(self):
+        """Invalide le texte mémorisé à chaque écriture d'une variable qui le compose.
+        Tcl appelle les traces de la plus récente à la plus ancienne : celle-ci passe
+        avant les traces _on_text_change posées dans _build_ui()."""
+        for var in (self.var_use_filename, self.var_use_prefix, self.var_prefix_text,
+                    self.var_use_suffix, self.var_suffix_text, self.var_use_custom,
+                    self.var_custom_text, self.var_use_date, self.var_date_position,
+                    self.var_date_source, self.var_date_format):
+            var.trace_add("write", self._invalidate_header_text)
+
+    def _invalidate_header_text(self, *_):
+        self._header_text = None
+
+    def _collect_text_options(self) -> dict:
+        """Options de composition du texte lues depuis la sidebar (format config)."""
+        return {
+            "use_filename":  self.var_use_filename.get(),
+            "use_prefix":    self.var_use_prefix.get(),
+            "prefix_text":   self.var_prefix_text.get(),
+            "use_suffix":    self.var_use_suffix.get(),
+            "suffix_text":   self.var_suffix_text.get(),
+            "use_custom":    self.var_use_custom.get(),
+            "custom_text":   self.var_custom_text.get(),
+            "use_date":      self.var_use_date.get(),
+            "date_position": self.var_date_position.get(),
+            "date_source":   DATE_SOURCE_INTERNAL.get(self.var_date_source.get(), "today"),
+            "date_format":   self.var_date_format.get(),
+        }
+
+    def _collect_settings(self) -> dict:
+        """Instantané des réglages de la sidebar au format config (valeurs simples)."""
+        try:
+            font_size = max(self.var_size.get(), SIZES["font_size_min"])
+        except (tk.TclError, ValueError):
+            font_size = self.cfg.get("font_size", 8)
+        try:
+            letter_spacing = float(self.var_letter_spacing.get())
+        except (ValueError, AttributeError):
+            letter_spacing = 0.0
+        try:
+            line_spacing = max(SIZES["line_spacing_min"], float(self.var_line_spacing.get()))
+        except (ValueError, AttributeError):
+            line_spacing = 1.2
+        try:
+            margin_x = float(self.var_margin_x.get())
+            margin_y = float(self.var_margin_y.get())
+        except (ValueError, AttributeError):
+            margin_x, margin_y = 20.0, 20.0
+        try:
+            frame_width = max(SIZES["frame_width_min"], float(self.var_frame_width.get()))
+        except (ValueError, AttributeError):
+            frame_width = 1.0
+        try:
+            frame_padding = max(SIZES["frame_pad_min"], float(self.var_frame_padding.get()))
+        except (ValueError, AttributeError):
+            frame_padding = 3.0
+
+        settings = self._collect_text_options()
+        settings.update({
+            "font_family":     self.var_font_family.get(),
+            "font_file":       self.cfg.get("font_file"),
+            "font_size":       font_size,
+            "bold":            self.var_bold.get(),
+            "italic":          self.var_italic.get(),
+            "underline":       self.var_underline.get(),
+            "letter_spacing":  letter_spacing,
+            "line_spacing":    line_spacing,
+            "color_hex":       self.cfg["color_hex"],
+            "preset_position": self.preset_position,
+            "margin_x_pt":     margin_x,
+            "margin_y_pt":     margin_y,
+            "last_x_ratio":    self.pos_ratio_x,
+            "last_y_ratio":    self.pos_ratio_y,
+            "rotation":        self.var_rotation.get(),
+            "use_frame":       self.var_use_frame.get(),
+            "frame_color_hex": self.cfg.get("frame_color_hex", COLORS["frame_default"]),
+            "frame_width":     frame_width,
+            "frame_style":     self.var_frame_style.get(),
+            "frame_padding":   frame_padding,
+            "frame_opacity":   max(0.0, min(1.0, self.var_frame_opacity.get())),
+            "use_bg":          self.var_use_bg.get(),
+            "bg_color_hex":    self.cfg.get("bg_color_hex", COLORS["bg_default"]),
+            "bg_opacity":      max(0.0, min(1.0, self.var_bg_opacity.get())),
+            "all_pages":       self.var_all_pages.get(),
+            "shared_stamp":    self.var_shared_stamp.get(),
+            "save_profile":    SAVE_PROFILE_INTERNAL.get(self.var_save_profile.get(), "compact"),
+        })
+        return settings
 
     # --------------------------------------------------------- PDF courant ---
 
     def _load_pdf(self):
+        """Affiche le fichier self.idx. Ouverture et premier rendu se font dans un thread
+        (réseau, gros scans) ; un placeholder occupe le canvas jusqu'à _on_pdf_loaded().
+        Un document préchargé par _prefetch_next() est repris tel quel.
+        """
         path = self.pdf_files[self.idx]
+        if self._first_load_t0 is None:
+            self._first_load_t0 = time.perf_counter()
         self.lbl_filename.configure(text=f"  {path.name}  ")
         self.lbl_progress.configure(text=f"  {self.idx + 1} / {len(self.pdf_files)}  ")
-        if self.doc:
-            self.doc.close()
-        self.doc = fitz.open(str(path))
-        # Lire les dims dès maintenant pour _recalc_ratio_from_preset()
-        page0 = self.doc[0]
-        self.page_w_pt = page0.rect.width
-        self.page_h_pt = page0.rect.height
+        self._load_seq += 1
+        seq = self._load_seq
+        old_doc, self.doc = self.doc, None
+        self._preview_img = None
+        self._preview_key = None
+        self._show_canvas_message(f"Chargement…\n{path.name}")
+        self._scroll_file_list_to(self.idx)
+        self._refresh_all_cards()
+        cw = max(self.canvas.winfo_width(),  10)
+        ch = max(self.canvas.winfo_height(), 10)
+
+        @_span("load")
+        def _run():
+            doc = err = None
+            try:
+                with _MUPDF_LOCK:
+                    if old_doc is not None:
+                        old_doc.close()
+                    meta = _read_file_meta(path)
+                    self._file_meta[path] = meta
+                    doc_key = (str(path), meta["mtime"])
+                    pre, self._prefetched = self._prefetched, None
+                    if pre is not None and pre[2] == doc_key:
+                        doc = pre[1]
+                    else:
+                        if pre is not None:
+                            pre[1].close()
+                        doc = fitz.open(str(path))
+                    dims = _warm_preview(doc, doc_key, cw, ch, self._preview_cache)
+            except Exception as e:
+                if doc is not None:
+                    with _MUPDF_LOCK:
+                        doc.close()
+                doc, doc_key, dims = None, None, None
+                err = str(e) or type(e).__name__
+            self.root.after(0, lambda: self._on_pdf_loaded(seq, path, doc, doc_key, dims, err))
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_pdf_loaded(self, seq: int, path: Path, doc, doc_key, dims, err):
+        if seq != self._load_seq:
+            # L'utilisateur est déjà passé à un autre fichier
+            if doc is not None:
+                threading.Thread(target=self._close_doc, args=(doc,), daemon=True).start()
+            return
+        if err:
+            _debug_log(f"LOAD ERREUR [{path.name}] {err}")
+            self.file_states[self.idx] = "erreur"
+            self._show_canvas_message(f"Impossible d'ouvrir {path.name}\n{err}")
+            self._refresh_all_cards()
+            return
+        self.doc     = doc
+        self.doc_key = doc_key
+        # Dims lues dès maintenant pour _recalc_ratio_from_preset()
+        self.page_w_pt, self.page_h_pt = dims
         self._recalc_ratio_from_preset()
         self._update_pos_label()
         self._on_text_change()
         self._render_preview()
-        self._refresh_all_cards()
+        self._prefetch_next()
+
+    @staticmethod
+    def _close_doc(doc):
+        with _MUPDF_LOCK:
+            doc.close()
+
+    def _prefetch_next(self):
+        """Ouvre et rend d'avance le fichier que _find_next_untreated() proposera ensuite."""
+        next_idx = self._find_next_untreated()
+        if next_idx is None:
+            return
+        path = self.pdf_files[next_idx]
+        cw = max(self.canvas.winfo_width(),  10)
+        ch = max(self.canvas.winfo_height(), 10)
+
+        def _run():
+            try:
+                with _MUPDF_LOCK:
+                    meta = _read_file_meta(path)
+                    self._file_meta[path] = meta
+                    doc_key = (str(path), meta["mtime"])
+                    pre = self._prefetched
+                    if pre is not None and pre[2] == doc_key:
+                        return
+                    self._prefetched = None
+                    if pre is not None:
+                        pre[1].close()
+                    doc = fitz.open(str(path))
+                    try:
+                        _warm_preview(doc, doc_key, cw, ch, self._preview_cache)
+                    except Exception:
+                        doc.close()
+                        raise
+                    self._prefetched = (path, doc, doc_key)
+                _debug_log(f"PREFETCH [{path.name}]")
+            except Exception as e:
+                _debug_log(f"PREFETCH ERREUR [{path.name}] {e}")
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _show_canvas_message(self, text: str):
+        """Remplace l'aperçu par un message centré (chargement, erreur d'ouverture)."""
+        self.canvas.delete("all")
+        self._ov = {}
+        self.canvas.create_text(max(self.canvas.winfo_width(), 10) // 2,
+                                max(self.canvas.winfo_height(), 10) // 2,
+                                text=text, justify="center", fill=COLORS["text_tertiary"],
+                                font=("Segoe UI", SIZES["font_main"]), tags="page")
 
     # --------------------------------------------------------- Rendu canvas ---
 
+    def _fit_scale(self, cw: int, ch: int) -> float:
+        return _preview_fit_scale(self.page_w_pt, self.page_h_pt, cw, ch)
+
+    def _on_canvas_configure(self, event):
+        """<Configure> : pendant un redimensionnement, le dernier rendu est seulement
+        ré-échantillonné par PIL ; le vrai rendu MuPDF attend que la taille soit stable."""
+        if self._resize_after_id is not None:
+            self.root.after_cancel(self._resize_after_id)
+        self._resize_after_id = self.root.after(TIMINGS["resize_debounce_ms"], self._on_resize_settled)
+        if not self.doc or self._preview_img is None:
+            return
+
+        cw = max(event.width,  10)
+        ch = max(event.height, 10)
+        scale = self._fit_scale(cw, ch)
+        w = max(1, round(self._preview_img.width  * scale / self._preview_img_scale))
+        h = max(1, round(self._preview_img.height * scale / self._preview_img_scale))
+        if (w, h) != (self.page_w_px, self.page_h_px):
+            img = self._preview_img.resize((w, h), Image.BILINEAR)
+            self.tk_img = ImageTk.PhotoImage(img)
+            self._preview_key = None     # image provisoire : le rendu final la remplacera
+            self.scale = scale
+            self.page_w_px = w
+            self.page_h_px = h
+        self._place_page_image(cw, ch)
+
+    def _on_resize_settled(self):
+        self._resize_after_id = None
+        self._render_preview()
+
+    def _retry_render(self):
+        self._render_retry = False
+        self._render_preview()
+
+    @_span("render")
     def _render_preview(self):
         if not self.doc:
             return
+        if self._busy:
+            # Pas d'appel MuPDF pendant qu'un thread enregistre : rendu repoussé à la fin
+            self._render_pending = True
+            return
         self.canvas.update_idletasks()
         cw = max(self.canvas.winfo_width(),  10)
         ch = max(self.canvas.winfo_height(), 10)
 
-        page = self.doc[0]
-        self.page_w_pt = page.rect.width
-        self.page_h_pt = page.rect.height
-
-        scale_w = (cw - SIZES["canvas_pad"]) / self.page_w_pt
-        scale_h = (ch - SIZES["canvas_pad"]) / self.page_h_pt
-        self.scale = min(scale_w, scale_h, SIZES["canvas_scale_max"])
-
-        mat = fitz.Matrix(self.scale, self.scale)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        self.page_w_px = pix.width
-        self.page_h_px = pix.height
-        _debug_log(
-            f"RENDER canvas_wh=({cw},{ch}) scale={self.scale:.4f} "
-            f"page_pt=({self.page_w_pt:.1f}x{self.page_h_pt:.1f}) "
-            f"page_px=({pix.width}x{pix.height}) "
-            f"tk_scaling={self.canvas.tk.call('tk','scaling'):.3f}"
-        )
-
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        self.tk_img = ImageTk.PhotoImage(img)
+        self.scale = _quantize_scale(self._fit_scale(cw, ch))
+
+        key = self.doc_key + (0, self.scale)
+        if key != self._preview_key:
+            img = self._preview_cache.get(key)
+            cached = img is not None
+            if not cached:
+                if not _MUPDF_LOCK.acquire(blocking=False):
+                    # Un (pré)chargement utilise MuPDF : nouvel essai un peu plus tard
+                    if not self._render_retry:
+                        self._render_retry = True
+                        self.root.after(TIMINGS["mupdf_retry_ms"], self._retry_render)
+                    return
+                try:
+                    img = _render_page_image(self.doc[0], self.scale)
+                finally:
+                    _MUPDF_LOCK.release()
+                self._preview_cache.put(key, img)
+            self.tk_img = ImageTk.PhotoImage(img)
+            self._preview_key = key
+            self._preview_img = img
+            self._preview_img_scale = self.scale
+            self.page_w_px = img.width
+            self.page_h_px = img.height
+            _debug_log(
+                f"RENDER canvas_wh=({cw},{ch}) scale={self.scale:.4f} "
+                f"page_pt=({self.page_w_pt:.1f}x{self.page_h_pt:.1f}) "
+                f"page_px=({img.width}x{img.height}) cache={'hit' if cached else 'miss'} "
+                f"({self._preview_cache.n_bytes // 1024} Ko) "
+                f"tk_scaling={self.canvas.tk.call('tk','scaling'):.3f}"
+            )
+        self._place_page_image(cw, ch)
 
-        self.img_offset_x = (cw - pix.width)  // 2
-        self.img_offset_y = (ch - pix.height) // 2
+    def _place_page_image(self, cw: int, ch: int):
+        """Centre self.tk_img dans le canvas et redessine l'overlay."""
+        self.img_offset_x = (cw - self.page_w_px) // 2
+        self.img_offset_y = (ch - self.page_h_px) // 2
 
         self.canvas.delete("all")
+        self._ov = {}
         self.canvas.create_image(self.img_offset_x, self.img_offset_y,
                                  anchor="nw", image=self.tk_img, tags="page")
         self._draw_overlay()
-
+        if self._first_load_t0:
+            _startup_log("first render", self._first_load_t0)
+            self._first_load_t0 = False   # une seule mesure par session
+
+    def _overlay_items(self) -> dict:
+        """Items canvas de l'overlay, créés une fois après chaque remise à zéro du canvas
+        (canvas.delete("all")) puis seulement déplacés / reconfigurés."""
+        if not self._ov:
+            c = self.canvas
+            guide = dict(fill=COLORS["overlay_guide"], width=1, dash=(4, 4), state="hidden", tags="overlay")
+            # Ordre de création = ordre d'empilement : guides, fond, cadre, texte, soulignement, croix
+            self._ov = {
+                "guide_h":   c.create_line(0, 0, 0, 0, **guide),
+                "guide_v":   c.create_line(0, 0, 0, 0, **guide),
+                "bg":        c.create_rectangle(0, 0, 0, 0, outline="", state="hidden", tags="overlay"),
+                "frame":     c.create_rectangle(0, 0, 0, 0, fill="", state="hidden", tags="overlay"),
+                "text":      c.create_text(0, 0, anchor="center", tags="overlay"),
+                "underline": c.create_line(0, 0, 0, 0, state="hidden", tags="overlay"),
+                "cross_h":   c.create_line(0, 0, 0, 0, width=1, tags="overlay"),
+                "cross_v":   c.create_line(0, 0, 0, 0, width=1, tags="overlay"),
+            }
+        return self._ov
+
+    def _update_guides(self, hover_cx=None, hover_cy=None):
+        """Croix de guidage au survol (masquée si hover_cx est None)."""
+        ov = self._overlay_items()
+        if hover_cx is None:
+            self.canvas.itemconfigure(ov["guide_h"], state="hidden")
+            self.canvas.itemconfigure(ov["guide_v"], state="hidden")
+            return
+        x0 = self.img_offset_x
+        x1 = self.img_offset_x + self.page_w_px
+        y0 = self.img_offset_y
+        y1 = self.img_offset_y + self.page_h_px
+        self.canvas.coords(ov["guide_h"], x0, hover_cy, x1, hover_cy)
+        self.canvas.coords(ov["guide_v"], hover_cx, y0, hover_cx, y1)
+        self.canvas.itemconfigure(ov["guide_h"], state="normal")
+        self.canvas.itemconfigure(ov["guide_v"], state="normal")
+
+    @_span("overlay")
     def _draw_overlay(self, hover_cx=None, hover_cy=None):
-        if not hasattr(self, "canvas"):
+        if not hasattr(self, "canvas") or self.doc is None:
             return
-        self.canvas.delete("overlay")
-
-        # Croix de guidage au survol
-        if hover_cx is not None:
-            x0 = self.img_offset_x
-            x1 = self.img_offset_x + self.page_w_px
-            y0 = self.img_offset_y
-            y1 = self.img_offset_y + self.page_h_px
-            self.canvas.create_line(x0, hover_cy, x1, hover_cy,
-                                    fill=COLORS["overlay_guide"], width=1, dash=(4,4), tags="overlay")
-            self.canvas.create_line(hover_cx, y0, hover_cx, y1,
-                                    fill=COLORS["overlay_guide"], width=1, dash=(4,4), tags="overlay")
+        canvas = self.canvas
+        ov = self._overlay_items()
+        self._update_guides(hover_cx, hover_cy)
 
         cx, cy  = self._ratio_to_canvas(self.pos_ratio_x, self.pos_ratio_y)
         text    = self._get_header_text()
@@ -1758,8 +4123,10 @@ class PDFHeaderApp:
         canvas_font_name = canvas_font_map.get(font_family, font_family)
         canvas_font = (canvas_font_name, fpx, style_str)
 
-        # Fond et cadre approximatifs (avant le texte)
-        if self.var_use_bg.get() or self.var_use_frame.get():
+        # Fond et cadre approximatifs (sous le texte)
+        use_bg    = self.var_use_bg.get()
+        use_frame = self.var_use_frame.get()
+        if use_bg or use_frame:
             approx_w = max(len(text) * fpx * SIZES["text_char_w"], 20)
             approx_h = fpx * SIZES["text_char_h"]
             try:
@@ -1770,43 +4137,49 @@ class PDFHeaderApp:
             bg_y0 = cy - approx_h / 2 - pad_px
             bg_x1 = cx + approx_w / 2 + pad_px
             bg_y1 = cy + approx_h / 2 + pad_px
-            if self.var_use_bg.get():
-                bg_col = self.cfg.get("bg_color_hex", COLORS["bg_default"])
-                self.canvas.create_rectangle(bg_x0, bg_y0, bg_x1, bg_y1,
-                                             fill=bg_col, outline="", tags="overlay")
-            if self.var_use_frame.get():
-                fc_hex = self.cfg.get("frame_color_hex", COLORS["frame_default"])
-                try:
-                    fw_px = max(1, int(float(self.var_frame_width.get()) * self.scale))
-                except (ValueError, AttributeError):
-                    fw_px = 1
-                f_dash = (4, 4) if self.var_frame_style.get() == "dashed" else ()
-                self.canvas.create_rectangle(bg_x0, bg_y0, bg_x1, bg_y1,
-                                             outline=fc_hex, width=fw_px,
-                                             dash=f_dash, fill="", tags="overlay")
+        if use_bg:
+            bg_col = self.cfg.get("bg_color_hex", COLORS["bg_default"])
+            canvas.coords(ov["bg"], bg_x0, bg_y0, bg_x1, bg_y1)
+            canvas.itemconfigure(ov["bg"], fill=bg_col, state="normal")
+        else:
+            canvas.itemconfigure(ov["bg"], state="hidden")
+        if use_frame:
+            fc_hex = self.cfg.get("frame_color_hex", COLORS["frame_default"])
+            try:
+                fw_px = max(1, int(float(self.var_frame_width.get()) * self.scale))
+            except (ValueError, AttributeError):
+                fw_px = 1
+            f_dash = (4, 4) if self.var_frame_style.get() == "dashed" else ()
+            canvas.coords(ov["frame"], bg_x0, bg_y0, bg_x1, bg_y1)
+            canvas.itemconfigure(ov["frame"], outline=fc_hex, width=fw_px, dash=f_dash, state="normal")
+        else:
+            canvas.itemconfigure(ov["frame"], state="hidden")
 
         # Texte avec rotation (ancré au centre)
+        canvas.coords(ov["text"], cx, cy)
+        canvas.itemconfigure(ov["text"], text=text, fill=color, font=canvas_font)
         try:
-            self.canvas.create_text(cx, cy, text=text, anchor="center",
-                                    fill=color, font=canvas_font,
-                                    angle=rotation, tags="overlay")
+            canvas.itemconfigure(ov["text"], angle=rotation)
         except tk.TclError:
-            self.canvas.create_text(cx, cy, text=text, anchor="center",
-                                    fill=color, font=canvas_font, tags="overlay")
+            pass
 
         # Soulignement approximatif (uniquement si rotation == 0)
         if self.var_underline.get() and rotation == 0:
             approx_w = max(len(text) * fpx * SIZES["text_char_w"], 20)
             approx_h = fpx * SIZES["text_char_h"]
             ul_y = cy + approx_h / 2 + max(1, int(fpx * SIZES["underline_thick"]))
-            self.canvas.create_line(cx - approx_w / 2, ul_y, cx + approx_w / 2, ul_y,
-                                    fill=color, width=max(1, int(fpx * SIZES["underline_thick"])),
-                                    tags="overlay")
+            canvas.coords(ov["underline"], cx - approx_w / 2, ul_y, cx + approx_w / 2, ul_y)
+            canvas.itemconfigure(ov["underline"], fill=color, state="normal",
+                                 width=max(1, int(fpx * SIZES["underline_thick"])))
+        else:
+            canvas.itemconfigure(ov["underline"], state="hidden")
 
         # Croix de repère
         r = SIZES["cross_radius"]
-        self.canvas.create_line(cx-r, cy, cx+r, cy, fill=color, width=1, tags="overlay")
-        self.canvas.create_line(cx, cy-r, cx, cy+r, fill=color, width=1, tags="overlay")
+        canvas.coords(ov["cross_h"], cx-r, cy, cx+r, cy)
+        canvas.coords(ov["cross_v"], cx, cy-r, cx, cy+r)
+        canvas.itemconfigure(ov["cross_h"], fill=color)
+        canvas.itemconfigure(ov["cross_v"], fill=color)
 
     # --------------------------------------------------------- Interactions ---
 
@@ -1822,11 +4195,11 @@ class PDFHeaderApp:
 
     def _ratio_to_pdf_pt(self, rx, ry):
         """Ratio → coordonnées PDF en points (Y=0 en bas)."""
-        x_pt = rx * self.page_w_pt
-        y_pt = (1.0 - ry) * self.page_h_pt
-        return x_pt, y_pt
+        return _pdf_pt_from_ratio(rx, ry, self.page_w_pt, self.page_h_pt)
 
     def _on_click(self, event):
+        if self._busy or self.doc is None:
+            return
         rx, ry = self._canvas_to_ratio(event.x, event.y)
         self.pos_ratio_x = rx
         self.pos_ratio_y = ry
@@ -1845,10 +4218,41 @@ class PDFHeaderApp:
         self._draw_overlay()
 
     def _on_motion(self, event):
-        self._draw_overlay(hover_cx=event.x, hover_cy=event.y)
-        rx, ry = self._canvas_to_ratio(event.x, event.y)
+        """<Motion> : seule la dernière position est retenue ; le dessin se fait au plus
+        une fois par TIMINGS["overlay_frame_ms"] dans _flush_motion()."""
+        if self.doc is None:
+            return
+        self._motion_xy = (event.x, event.y)
+        if self._motion_after_id is None:
+            self._motion_after_id = self.root.after(TIMINGS["overlay_frame_ms"], self._flush_motion)
+
+    def _flush_motion(self):
+        self._motion_after_id = None
+        if self.doc is None or self._motion_xy is None:
+            return
+        t0 = time.perf_counter()
+        x, y = self._motion_xy
+        # L'en-tête ne dépend pas de la souris : seuls les guides bougent
+        self._update_guides(x, y)
+        rx, ry = self._canvas_to_ratio(x, y)
         x_pt, y_pt = self._ratio_to_pdf_pt(rx, ry)
         self.lbl_coords.configure(text=f"x: {x_pt:.0f} pts  ·  y: {y_pt:.0f} pts")
+        self._record_overlay_time(time.perf_counter() - t0)
+
+    def _record_overlay_time(self, elapsed: float):
+        """Cumule la durée des redessins souris ; moyenne / max au log debug
+        toutes les TIMINGS["overlay_stats_s"] secondes."""
+        st = self._ov_stats
+        if st[0] == 0:
+            st[3] = time.perf_counter() - elapsed
+        st[0] += 1
+        st[1] += elapsed
+        st[2] = max(st[2], elapsed)
+        now = time.perf_counter()
+        if now - st[3] >= TIMINGS["overlay_stats_s"]:
+            _debug_log(f"OVERLAY {st[0]} redessin(s) en {now - st[3]:.1f} s — "
+                       f"moy {st[1] / st[0] * 1000:.2f} ms, max {st[2] * 1000:.2f} ms")
+            self._ov_stats = [0, 0.0, 0.0, now]
 
     def _update_pos_label(self):
         x_pt, y_pt = self._ratio_to_pdf_pt(self.pos_ratio_x, self.pos_ratio_y)
@@ -1860,248 +4264,551 @@ class PDFHeaderApp:
     # ------------------------------------------------------------ Actions ---
 
     def _apply(self):
-        path     = self.pdf_files[self.idx]
-        out_dir  = path.parent.with_name(path.parent.name + "_avec_entete")
-        out_dir.mkdir(parents=True, exist_ok=True)
-        out_path = out_dir / path.name
-
-        header_text = self._get_header_text()
-        color_float = hex_to_rgb_float(self.cfg["color_hex"])
-        font_size   = max(self.var_size.get(), SIZES["font_size_min"])
-        all_pages   = self.var_all_pages.get()
-        rotation    = self.var_rotation.get()
-        x_pt, y_pt = self._ratio_to_pdf_pt(self.pos_ratio_x, self.pos_ratio_y)
-
-        font_family = self.var_font_family.get()
-        font_file   = self.cfg.get("font_file")
-        bold        = self.var_bold.get()
-        italic      = self.var_italic.get()
-        underline   = self.var_underline.get()
-        font_args   = _get_fitz_font_args(font_family, font_file, bold, italic)
-
-        try:
-            line_spacing = max(SIZES["line_spacing_min"], float(self.var_line_spacing.get()))
-        except (ValueError, AttributeError):
-            line_spacing = 1.2
-
-        use_frame     = self.var_use_frame.get()
-        frame_color   = hex_to_rgb_float(self.cfg.get("frame_color_hex", COLORS["frame_default"]))
-        try:
-            frame_width = max(SIZES["frame_width_min"], float(self.var_frame_width.get()))
-        except (ValueError, AttributeError):
-            frame_width = 1.0
-        frame_style   = self.var_frame_style.get()
-        try:
-            frame_padding = max(SIZES["frame_pad_min"], float(self.var_frame_padding.get()))
-        except (ValueError, AttributeError):
-            frame_padding = 3.0
-        frame_opacity = max(0.0, min(1.0, self.var_frame_opacity.get()))
-
-        use_bg     = self.var_use_bg.get()
-        bg_color   = hex_to_rgb_float(self.cfg.get("bg_color_hex", COLORS["bg_default"]))
-        bg_opacity = max(0.0, min(1.0, self.var_bg_opacity.get()))
-
-        try:
-            doc_out = fitz.open(str(path))
-            pages_to_process = range(len(doc_out)) if all_pages else [0]
-
-            _debug_log(
-                f"APPLY [{path.name}] ratio=({self.pos_ratio_x:.4f},{self.pos_ratio_y:.4f}) "
-                f"x_pt={x_pt:.1f} y_pt={y_pt:.1f} rotation={rotation} font={font_family}"
-            )
-
-            for i in pages_to_process:
-                pg   = doc_out[i]
-                pg_w = pg.rect.width
-                pg_h = pg.rect.height
-                # Conversion Y : fitz (Y=0 en haut)
-                fitz_y = pg_h - y_pt
+        """Lance l'application sur le fichier courant dans un thread de travail.
+        La fin est traitée par _on_apply_done() sur le thread Tk.
+        """
+        if self._busy or self._waiting_scan:
+            return      # en attente du scan : self.idx désigne un fichier déjà traité
+        idx      = self.idx
+        path     = self.pdf_files[idx]
+        out_path = _output_path_for(path, self.scan_root)
+        settings = self._collect_settings()
+        meta     = self._meta_for(path)
+
+        self._start_processing(f"{path.name}", part_path=_partial_path(out_path))
+        cancel = self._cancel_event
+
+        def _run():
+            err = stats = None
+            try:
+                with _MUPDF_LOCK:
+                    stats = _stamp_file(path, out_path, settings,
+                                        progress=self._post_progress, cancel=cancel)
+                _record_stamp_spans(stats)
+            except _StampCancelled:
+                err = _StampCancelled
+            except PermissionError:
+                err = "Le fichier est ouvert dans un autre programme. Fermez-le et réessayez."
+            except Exception as e:
+                err = str(e) or type(e).__name__
+            self.root.after(0, lambda: self._on_apply_done(idx, settings, err, meta, stats))
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_apply_done(self, idx, settings: dict, err, meta=None, stats=None):
+        self._stop_processing()
+        if err is _StampCancelled:
+            _debug_log(f"APPLY_CANCEL [{self.pdf_files[idx].name}]")
+            return
+        path = self.pdf_files[idx]
+        bytes_in = meta["size"] if meta else None
+        if err:
+            self._report.record(path, "erreur", self.scan_root, bytes_in=bytes_in)
+            messagebox.showerror("Erreur", err)
+            self.file_states[idx] = "erreur"
+            self._refresh_all_cards()
+            return
 
-                # Estimation largeur texte pour fond/cadre/soulignement
-                text_width = len(header_text) * font_size * SIZES["text_w_fallback"]  # fallback
-                if use_bg or use_frame or underline:
-                    try:
-                        if "fontfile" in font_args:
-                            font_obj = fitz.Font(fontfile=font_args["fontfile"])
-                        else:
-                            font_obj = fitz.Font(fontname=font_args.get("fontname", "cour"))
-                        text_width = font_obj.text_length(header_text, font_size)
-                    except Exception:
-                        pass
-
-                # half_h : demi-hauteur d'une ligne — sert à centrer texte/cadre/fond sur fitz_y
-                lineheight = line_spacing  # facteur multiplicateur de fontsize (ex: 1.2 → 1.2×12=14.4 pts)
-                half_h = font_size * lineheight / 2
-
-                # Fond et cadre (avant le texte) — centrés sur (x_pt, fitz_y)
-                if use_bg or use_frame:
-                    pad = frame_padding
-                    bg_rect = fitz.Rect(
-                        x_pt - text_width / 2 - pad,
-                        fitz_y - half_h - pad,
-                        x_pt + text_width / 2 + pad,
-                        fitz_y + half_h + pad
-                    )
-                    if use_bg:
-                        pg.draw_rect(bg_rect,
-                                     fill=bg_color,
-                                     fill_opacity=bg_opacity,
-                                     color=None,
-                                     width=0)
-                    if use_frame:
-                        dashes = "[3 3] 0" if frame_style == "dashed" else None
-                        pg.draw_rect(bg_rect,
-                                     color=frame_color,
-                                     width=frame_width,
-                                     stroke_opacity=frame_opacity,
-                                     fill=None,
-                                     dashes=dashes)
-
-                # Rect d'insertion du texte — centré sur (x_pt, fitz_y)
-                # y0 = fitz_y - half_h → insert_textbox remplit vers le bas sur font_size*lineheight
-                # → centre visuel du texte ≈ fitz_y, cohérent avec l'overlay (anchor="center")
-                half_w = max(pg_w / 2, text_width / 2 + 10)
-                text_rect = fitz.Rect(
-                    max(0, x_pt - half_w),
-                    fitz_y - half_h,
-                    min(pg_w, x_pt + half_w),
-                    fitz_y + half_h * 2   # marge extra en bas pour éviter toute troncature
-                )
-                _debug_log(
-                    f"  page[{i}] pg=({pg_w:.1f}x{pg_h:.1f}) "
-                    f"fitz_y={fitz_y:.1f} text_rect={text_rect}"
-                )
-
-                pg.insert_textbox(
-                    text_rect,
-                    header_text,
-                    fontsize=font_size,
-                    color=color_float,
-                    rotate=rotation,
-                    lineheight=lineheight,
-                    align=fitz.TEXT_ALIGN_CENTER,
-                    **font_args,
-                )
-
-                # Soulignement — centré sur x_pt
-                if underline:
-                    ul_y = fitz_y + font_size * SIZES["underline_offset"]
-                    pg.draw_line(
-                        fitz.Point(x_pt - text_width / 2, ul_y),
-                        fitz.Point(x_pt + text_width / 2, ul_y),
-                        color=color_float,
-                        width=max(0.5, font_size * SIZES["underline_width"])
-                    )
+        # Sauvegarde config
+        self.cfg.update(settings)
+        save_config(self.cfg)
 
-            doc_out.save(str(out_path), garbage=4, deflate=True)
-            doc_out.close()
+        self._record_manifest(path, meta, _settings_digest(settings), stats)
+        self._report.record(path, "traite", self.scan_root, stats, bytes_in)
+        self.file_states[idx] = "traite"
+        self._advance()
 
-        except PermissionError:
-            messagebox.showerror("Erreur",
-                "Le fichier est ouvert dans un autre programme. Fermez-le et réessayez.")
-            self.file_states[self.idx] = "erreur"
-            self._refresh_all_cards()
+    def _skip(self):
+        """Passe le fichier courant. Seul un fichier pas encore traité (non traité, ou
+        en erreur après un essai) change d'état : un fichier traité ou déjà passé, rouvert
+        depuis sa carte, reste tel quel et n'ajoute pas de ligne au rapport."""
+        if self._busy or self._waiting_scan:
             return
-        except Exception as e:
-            messagebox.showerror("Erreur", str(e))
-            self.file_states[self.idx] = "erreur"
+        if self.file_states[self.idx] in ("non_traite", "erreur"):
+            path = self.pdf_files[self.idx]
+            meta = self._meta_for(path)
+            self._report.record(path, "passe", self.scan_root,
+                                bytes_in=meta["size"] if meta else None)
+            self.file_states[self.idx] = "passe"
+        self._advance()
+
+    def _advance(self):
+        """Passe au prochain fichier non traité ; sinon attend la suite du scan
+        de dossier en cours, ou termine la session."""
+        next_idx = self._find_next_untreated()
+        if next_idx is not None:
+            self.idx = next_idx
+            self._load_pdf()
+            return
+        if self._scan_cancel is not None:
+            self._waiting_scan = True
+            self._set_action_state(False)
+            old_doc, self.doc = self.doc, None
+            if old_doc is not None:
+                threading.Thread(target=self._close_doc, args=(old_doc,), daemon=True).start()
+            self._show_canvas_message("Analyse du dossier en cours…")
             self._refresh_all_cards()
             return
+        self._finish_session()
 
-        # Sauvegarde config
-        try:
-            letter_spacing = float(self.var_letter_spacing.get())
-        except (ValueError, AttributeError):
-            letter_spacing = 0.0
-        try:
-            margin_x = float(self.var_margin_x.get())
-            margin_y = float(self.var_margin_y.get())
-        except (ValueError, AttributeError):
-            margin_x, margin_y = 20.0, 20.0
+    def _finish_session(self):
+        self._refresh_all_cards()
+        messagebox.showinfo("Terminé", self._report_text("Tous les fichiers ont été traités !"))
+        self.root.quit()
+
+    def _report_text(self, headline: str) -> str:
+        """headline suivi du résumé de session et du chemin du rapport détaillé."""
+        if not self._report.rows:
+            return headline
+        lines = [headline, ""] + self._report.summary_lines()
+        if self._report.paths:
+            lines += ["", "Rapport détaillé :"] + [str(p) for p in self._report.paths]
+        return "\n".join(lines)
+
+    def _apply_all(self):
+        """Applique les réglages courants à tous les fichiers non traités.
+        Pool de processus alimenté depuis un thread ; chaque résultat est renvoyé
+        au thread Tk via root.after() et met à jour file_states et la carte.
+        """
+        indices = self.file_states.untreated()
+        if self._busy or not indices:
+            return
+        settings = self._collect_settings()
+        digest   = _settings_digest(settings)
+        metas    = {i: self._meta_for(self.pdf_files[i]) for i in indices}
+        jobs     = [(i, self.pdf_files[i], _output_path_for(self.pdf_files[i], self.scan_root))
+                    for i in indices]
+        workers  = _batch_worker_count(self.cfg.get("batch_workers", 0), len(jobs))
+        _debug_log(f"APPLY_ALL {len(jobs)} fichier(s) workers={workers}")
+
+        self._batch_total = len(jobs)
+        self._batch_count = 0
+        self._start_processing(f"Fichier 0 / {len(jobs)}")
+        cancel = self._cancel_event
+
+        def _run():
+            errors = 0
+            for idx, stats, err in _iter_batch_dedup(jobs, dict(self.cfg, **settings),
+                                                     workers, cancel):
+                errors += 1 if err else 0
+                self.root.after(0, lambda i=idx, s=stats, e=err:
+                                self._on_batch_result(i, e, metas[i], digest, s))
+            self.root.after(0, lambda: self._on_batch_done(settings, errors))
+
+        threading.Thread(target=_run, daemon=True).start()
+
+    def _on_batch_result(self, idx, err, meta=None, digest=None, stats=None):
+        self.file_states[idx] = "erreur" if err else "traite"
+        self._report.record(self.pdf_files[idx], self.file_states[idx], self.scan_root,
+                            stats, meta["size"] if meta else None)
+        if err:
+            _debug_log(f"APPLY_ALL ERREUR [{self.pdf_files[idx].name}] {err}")
+        else:
+            self._record_manifest(self.pdf_files[idx], meta, digest, stats)
+        self._batch_count += 1
+        self.lbl_job.configure(text=f"Fichier {self._batch_count} / {self._batch_total}")
+        self.progress_bar.set(self._batch_count / max(self._batch_total, 1))
+        self._refresh_card(idx)
+        self._refresh_file_counter()
 
-        self.cfg.update({
-            "use_filename":    self.var_use_filename.get(),
-            "use_prefix":      self.var_use_prefix.get(),
-            "prefix_text":     self.var_prefix_text.get(),
-            "use_suffix":      self.var_use_suffix.get(),
-            "suffix_text":     self.var_suffix_text.get(),
-            "use_custom":      self.var_use_custom.get(),
-            "custom_text":     self.var_custom_text.get(),
-            "use_date":        self.var_use_date.get(),
-            "date_position":   self.var_date_position.get(),
-            "date_source":     DATE_SOURCE_INTERNAL.get(self.var_date_source.get(), "today"),
-            "date_format":     self.var_date_format.get(),
-            "font_family":     self.var_font_family.get(),
-            "font_size":       font_size,
-            "bold":            bold,
-            "italic":          italic,
-            "underline":       underline,
-            "letter_spacing":  letter_spacing,
-            "line_spacing":    line_spacing,
-            "color_hex":       self.cfg["color_hex"],
-            "preset_position": self.preset_position,
-            "margin_x_pt":     margin_x,
-            "margin_y_pt":     margin_y,
-            "last_x_ratio":    self.pos_ratio_x,
-            "last_y_ratio":    self.pos_ratio_y,
-            "rotation":        rotation,
-            "use_frame":       use_frame,
-            "frame_color_hex": self.cfg.get("frame_color_hex", COLORS["frame_default"]),
-            "frame_width":     frame_width,
-            "frame_style":     frame_style,
-            "frame_padding":   frame_padding,
-            "frame_opacity":   frame_opacity,
-            "use_bg":          use_bg,
-            "bg_color_hex":    self.cfg.get("bg_color_hex", COLORS["bg_default"]),
-            "bg_opacity":      bg_opacity,
-            "all_pages":       all_pages,
-        })
+    def _on_batch_done(self, settings: dict, n_errors: int):
+        cancelled = self._cancel_event.is_set()
+        self._stop_processing()
+        self.cfg.update(settings)
         save_config(self.cfg)
+        self._refresh_all_cards()
+        n_done = self._batch_count - n_errors
+        if cancelled:
+            messagebox.showinfo("Annulé", self._report_text(
+                f"{n_done} fichier(s) traité(s) avant l'annulation, {n_errors} en erreur."))
+            return
+        if n_errors:
+            messagebox.showwarning("Terminé", self._report_text(
+                f"{n_done} fichier(s) traité(s), {n_errors} en erreur."))
+            return
+        messagebox.showinfo("Terminé", self._report_text("Tous les fichiers ont été traités !"))
+        self.root.quit()
 
-        self.file_states[self.idx] = "traite"
-        next_idx = self._find_next_untreated()
-        if next_idx is None:
-            self._refresh_all_cards()
-            messagebox.showinfo("Terminé", "Tous les fichiers ont été traités !")
-            self.root.quit()
+    # -------------------------------------------------- Progression / Annuler ---
+
+    def _start_processing(self, label: str, part_path=None):
+        """Passe l'UI en mode traitement : sidebar désactivée, progression + Annuler."""
+        self._busy          = True
+        self._cancel_event  = threading.Event()
+        self._progress_last = 0.0
+        self._progress_part = part_path
+        self._set_ui_state(False)
+        self.lbl_job.configure(text=label)
+        self.progress_bar.set(0)
+        self.btn_cancel.configure(state="normal")
+        self._progress_frame.pack(side="bottom", fill="x", before=self._sidebar_scroll)
+
+    def _stop_processing(self):
+        self._busy          = False
+        self._progress_part = None
+        self._progress_frame.pack_forget()
+        self._set_ui_state(True)
+        if self._render_pending:
+            self._render_pending = False
+            self._render_preview()
+
+    def _cancel_processing(self):
+        self._cancel_event.set()
+        self.btn_cancel.configure(state="disabled")
+        self.lbl_job.configure(text="Annulation…")
+
+    def _post_progress(self, phase: str, done: int, total: int):
+        """Callback de _stamp_file, appelé depuis le thread de travail.
+        Relaie vers Tk via root.after(), au plus un rafraîchissement par intervalle.
+        """
+        now = time.monotonic()
+        if phase == "pages" and done < total and \
+                (now - self._progress_last) * 1000 < TIMINGS["progress_interval_ms"]:
             return
-        self.idx = next_idx
-        self._load_pdf()
+        self._progress_last = now
+        self.root.after(0, lambda: self._update_progress(phase, done, total))
 
-    def _skip(self):
-        self.file_states[self.idx] = "passe"
-        next_idx = self._find_next_untreated()
-        if next_idx is None:
-            self._refresh_all_cards()
-            messagebox.showinfo("Terminé", "Tous les fichiers ont été traités !")
-            self.root.quit()
+    def _update_progress(self, phase: str, done: int, total: int):
+        if not self._busy or self._cancel_event.is_set():
             return
-        self.idx = next_idx
-        self._load_pdf()
+        if phase == "pages":
+            self.lbl_job.configure(text=f"Page {done} / {total}")
+            self.progress_bar.set(done / max(total, 1))
+        elif phase == "save":
+            self.progress_bar.set(1.0)
+            self._poll_save_bytes()
+
+    def _poll_save_bytes(self):
+        """Affiche les octets déjà écrits dans le fichier .part pendant save()."""
+        if not self._busy or self._progress_part is None or self._cancel_event.is_set():
+            return
+        try:
+            written = self._progress_part.stat().st_size
+        except OSError:
+            written = 0
+        self.lbl_job.configure(text=f"Enregistrement… {written / 1_048_576:.1f} Mo écrits")
+        self.root.after(TIMINGS["progress_poll_ms"], self._poll_save_bytes)
 
 # ---------------------------------------------------------------------------
 # Point d'entrée
 # ---------------------------------------------------------------------------
+def _ts():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def run_batch(folder, config_path=None, workers=None, recursive=None, force=False) -> int:
+    """Mode batch sans fenêtre : applique la config à tous les PDFs du dossier.
+    Même géométrie que l'application interactive. Retourne le code de sortie (0 = succès).
+    workers : nb de processus (None → config "batch_workers", 0 → nb de cœurs).
+    recursive : sous-dossiers inclus, arborescence reproduite en sortie
+    (None → config "scan_recursive").
+    force : ignore le manifeste de sortie (tous les fichiers sont retraités).
+    """
+    global _DEBUG_ENABLED
+    cfg = load_config(config_path)
+    _DEBUG_ENABLED = cfg.get("debug_enabled", False)
+
+    folder = Path(folder)
+    if not folder.is_dir():
+        print(f"[{_ts()}] BATCH ERREUR dossier introuvable: {folder}")
+        return 2
+    if recursive is None:
+        recursive = cfg.get("scan_recursive", False)
+    found = list(_scan_pdfs(folder, recursive))
+    pdf_files = [path for path, _meta in found]
+    print(f"[{_ts()}] BATCH {len(pdf_files)} fichier(s) PDF dans {folder}"
+          f"{' (sous-dossiers inclus)' if recursive else ''}")
+
+    states    = _FileStates(len(pdf_files))
+    report    = _SessionReport()
+    manifests = _Manifests()
+    digest    = _settings_digest(cfg)
+    jobs = []
+    for i, (path, meta) in enumerate(found):
+        if not force and manifests.is_current(path, meta, folder, digest):
+            states[i] = "traite"
+        else:
+            jobs.append((i, path, _output_path_for(path, folder)))
+    n_unchanged = len(pdf_files) - len(jobs)
+    if n_unchanged:
+        print(f"[{_ts()}] BATCH {n_unchanged} fichier(s) inchangé(s) depuis le dernier passage (manifeste)")
+    n_workers = _batch_worker_count(cfg.get("batch_workers", 0) if workers is None else workers,
+                                    len(jobs))
+    profile = cfg.get("save_profile", "compact")
+    print(f"[{_ts()}] BATCH {n_workers} processus, profil {_effective_save_profile(profile)}")
+    _warn_profile_fallback("BATCH", profile)
+
+    # Import de PyMuPDF hors des mesures : avec un seul worker, le tampon tourne dans ce
+    # process et le premier fichier paierait l'import (pool : _init_pool_worker)
+    fitz.open
+    n_pages = save_ms = bytes_out = n_linked = n_fallback = 0
+    t0 = last_flush = time.perf_counter()
+    for idx, stats, err in _iter_batch_dedup(jobs, cfg, n_workers):
+        path, meta = found[idx]
+        if err:
+            states[idx] = "erreur"
+            report.record(path, "erreur", folder, bytes_in=meta["size"])
+            print(f"[{_ts()}] BATCH ERREUR [{pdf_files[idx].name}]: {err}")
+        else:
+            states[idx] = "traite"
+            n_linked  += 1 if stats.get("linked") else 0
+            n_fallback += not stats.get("linked") and \
+                stats.get("save_profile") != _effective_save_profile(profile)
+            n_pages   += stats["pages"]
+            save_ms   += stats["save_ms"]
+            bytes_out += stats["bytes_out"]
+            report.record(path, "traite", folder, stats, meta["size"])
+            manifests.record(path, meta, folder, digest, stats["bytes_out"])
+            if (time.perf_counter() - last_flush) * 1000 >= TIMINGS["manifest_flush_ms"]:
+                manifests.flush()
+                last_flush = time.perf_counter()
+    manifests.flush()
+    elapsed = max(time.perf_counter() - t0, 1e-9)
+    n_files  = states.count("traite") - n_unchanged
+    n_errors = states.count("erreur")
+
+    print(
+        f"[{_ts()}] BATCH termine: {n_files} fichier(s), {n_pages} page(s), "
+        f"{n_errors} erreur(s) en {elapsed:.2f} s — "
+        f"{n_files / elapsed:.1f} fichiers/s, {n_pages / elapsed:.1f} pages/s"
+    )
+    if n_files > n_linked:
+        print(
+            f"[{_ts()}] BATCH sauvegarde: {save_ms / (n_files - n_linked):.0f} ms/fichier, "
+            f"sortie {bytes_out / 1_048_576:.1f} Mo"
+        )
+    if n_linked:
+        print(f"[{_ts()}] BATCH {n_linked} doublon(s) : sortie reprise d'un fichier identique")
+    if n_fallback:
+        print(f"[{_ts()}] BATCH ATTENTION {n_fallback} fichier(s) enregistré(s) avec un autre profil "
+              f"que {_effective_save_profile(profile)} (voir le résumé ci-dessous)")
+    report.close()
+    if report.rows:
+        for line in report.summary_lines()[2:]:
+            print(f"[{_ts()}] BATCH {line}")
+        for target in report.paths:
+            print(f"[{_ts()}] BATCH rapport: {target}")
+    return 1 if n_errors else 0
+
+def _warn_profile_fallback(tag: str, profile: str):
+    """Avertit (stdout) si le profil demandé n'est pas disponible avec ce MuPDF."""
+    effective = _effective_save_profile(profile)
+    if effective != profile:
+        print(f"[{_ts()}] {tag} ATTENTION profil {profile} indisponible avec MuPDF "
+              f"{fitz.VersionBind} — enregistrement en {effective}")
+
+def _finish_spans(path=None):
+    """Fin de session : résumé des spans au log debug, et export JSON vers path (--spans)."""
+    for name, st in _SPANS.summary().items():
+        _debug_log(f"SPAN {name}: n={st['count']} p50={st['p50_ms']:.1f} ms "
+                   f"p95={st['p95_ms']:.1f} ms max={st['max_ms']:.1f} ms")
+    if path:
+        try:
+            _SPANS.export(path)
+            print(f"[{_ts()}] SPANS exportés: {path}")
+        except OSError as e:
+            print(f"[{_ts()}] SPANS export impossible: {e}")
+
+def run_watch(folder, config_path=None, workers=None, recursive=None) -> int:
+    """Mode surveillance sans fenêtre : tamponne les PDFs à mesure qu'ils arrivent
+    dans folder, avec la config enregistrée, jusqu'à Ctrl+C / SIGTERM.
+    Relevé os.scandir toutes les TIMINGS["watch_poll_ms"] (stat seulement, index
+    chemin → taille, mtime) ; un fichier n'est pris qu'une fois taille et date stables
+    depuis TIMINGS["watch_stable_s"]. Pool de workers borné : au plus 2 fichiers en
+    file par processus, le reste attend son tour. Manifeste et rapport comme run_batch.
+    """
+    global _DEBUG_ENABLED
+    cfg = load_config(config_path)
+    _DEBUG_ENABLED = cfg.get("debug_enabled", False)
+
+    folder = Path(folder)
+    if not folder.is_dir():
+        print(f"[{_ts()}] WATCH ERREUR dossier introuvable: {folder}")
+        return 2
+    if recursive is None:
+        recursive = cfg.get("scan_recursive", False)
+    n_workers = _batch_worker_count(cfg.get("batch_workers", 0) if workers is None else workers,
+                                    os.cpu_count() or 1)
+    manifests = _Manifests()
+    report    = _SessionReport()
+    digest    = _settings_digest(cfg)
+    profile   = _effective_save_profile(cfg.get("save_profile", "compact"))
+    print(f"[{_ts()}] WATCH {folder}{' (sous-dossiers inclus)' if recursive else ''} — "
+          f"{n_workers} processus, profil {profile} (Ctrl+C pour arrêter)")
+    _warn_profile_fallback("WATCH", cfg.get("save_profile", "compact"))
+
+    # Ctrl+C / SIGTERM : fin de boucle propre (pas de KeyboardInterrupt au milieu d'une
+    # écriture de manifeste) ; aussi quand le shell a lancé le process avec SIGINT ignoré
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT,  lambda *_: stop.set())
+
+    pending  = {}        # path → ((size, mtime), vu depuis) : en attente de stabilité
+    handled  = {}        # path → (size, mtime) déjà pris en charge (tamponné, ignoré, en file)
+    ready    = deque()   # (path, meta) stables, en attente d'un worker
+    inflight = {}        # Future → (path, meta)
+    poll_s   = TIMINGS["watch_poll_ms"] / 1000
+    last_flush = time.monotonic()
+
+    ctx = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=ctx,
+                               initializer=_init_pool_worker, initargs=(_DEBUG_ENABLED,))
+    try:
+        while not stop.is_set():
+            now = time.monotonic()
+            seen = set()
+            for path, meta in _scan_pdfs(folder, recursive, stop, check_magic=False):
+                seen.add(path)
+                sig = (meta["size"], meta["mtime"])
+                if handled.get(path) == sig:
+                    continue
+                first = pending.get(path)
+                if first is None or first[0] != sig:
+                    pending[path] = (sig, now)     # nouveau ou encore en cours d'écriture
+                    continue
+                if now - first[1] < TIMINGS["watch_stable_s"]:
+                    continue
+                del pending[path]
+                handled[path] = sig
+                if not _has_pdf_magic(path):
+                    _debug_log(f"WATCH [{path.name}] ignoré : pas de signature %PDF")
+                elif manifests.is_current(path, meta, folder, digest):
+                    _debug_log(f"WATCH [{path.name}] inchangé (manifeste)")
+                else:
+                    ready.append((path, meta))
+            # Fichiers disparus : oubliés (un retour sous le même nom sera retraité)
+            for index in (pending, handled):
+                for path in [p for p in index if p not in seen]:
+                    del index[path]
+
+            while ready and len(inflight) < n_workers * 2:
+                path, meta = ready.popleft()
+                fut = pool.submit(_stamp_worker, str(path), str(_output_path_for(path, folder)), cfg)
+                inflight[fut] = (path, meta)
+
+            if inflight:
+                done, _ = wait(list(inflight), timeout=poll_s, return_when=FIRST_COMPLETED)
+            else:
+                done = ()
+                stop.wait(poll_s)
+            for fut in done:
+                path, meta = inflight.pop(fut)
+                try:
+                    stats, err = fut.result()
+                except Exception as e:  # BrokenProcessPool : worker tué
+                    stats, err = None, str(e) or type(e).__name__
+                _record_stamp_spans(stats)
+                if _DEBUG_ENABLED:
+                    _DEBUG_WRITER.check_size()
+                if err:
+                    report.record(path, "erreur", folder, bytes_in=meta["size"])
+                    print(f"[{_ts()}] WATCH ERREUR [{path.name}]: {err}")
+                    continue
+                report.record(path, "traite", folder, stats, meta["size"])
+                manifests.record(path, meta, folder, digest, stats["bytes_out"])
+                fallback = "" if stats["save_profile"] == profile else \
+                    f" — ATTENTION enregistré en {stats['save_profile']} au lieu de {profile}"
+                print(f"[{_ts()}] WATCH traité [{path.relative_to(folder)}] {stats['pages']} p. en "
+                      f"{stats['open_ms'] + stats['stamp_ms'] + stats['save_ms']:.0f} ms{fallback}")
+            if time.monotonic() - last_flush >= TIMINGS["manifest_flush_ms"] / 1000:
+                manifests.flush()
+                last_flush = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[{_ts()}] WATCH arrêt — fin des fichiers en cours de tampon…")
+        # Workers insensibles à SIGINT (_init_pool_worker) : ceux qui tamponnent vont au
+        # bout, les fichiers pas encore démarrés sont annulés
+        pool.shutdown(wait=True, cancel_futures=True)
+        n_finished = n_abandoned = 0
+        for fut, (path, meta) in inflight.items():
+            if fut.cancelled():
+                n_abandoned += 1
+                continue
+            try:
+                stats, err = fut.result()
+            except Exception as e:  # BrokenProcessPool : worker tué
+                stats, err = None, str(e) or type(e).__name__
+            if err:
+                report.record(path, "erreur", folder, bytes_in=meta["size"])
+                print(f"[{_ts()}] WATCH ERREUR [{path.name}]: {err}")
+                continue
+            n_finished += 1
+            report.record(path, "traite", folder, stats, meta["size"])
+            manifests.record(path, meta, folder, digest, stats["bytes_out"])
+        n_abandoned += len(ready)
+        print(f"[{_ts()}] WATCH arrêté : {n_finished} fichier(s) terminé(s) pendant l'arrêt, "
+              f"{n_abandoned} pas encore démarré(s) (repris au prochain lancement)")
+        manifests.flush()
+        report.close()
+        if report.rows:
+            for line in report.summary_lines():
+                print(f"[{_ts()}] WATCH {line}")
+    return 0
+
 def main():
+    parser = argparse.ArgumentParser(description="PDF Header Tool")
+    parser.add_argument("paths", nargs="*",
+                        help="fichiers PDF ou dossiers à ouvrir dans l'interface")
+    parser.add_argument("--batch", metavar="DOSSIER",
+                        help="applique la config à tous les PDFs du dossier, sans fenêtre")
+    parser.add_argument("--watch", metavar="DOSSIER",
+                        help="surveille le dossier et tamponne les nouveaux PDFs, sans fenêtre")
+    parser.add_argument("--config", metavar="FICHIER",
+                        help="config JSON du mode batch / watch (défaut : pdf_header_config.json)")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="processus du mode batch / watch (0 = nb de cœurs, défaut : config)")
+    parser.add_argument("--recursive", action="store_true", default=None,
+                        help="mode batch / watch : inclut les sous-dossiers (défaut : config)")
+    parser.add_argument("--force", action="store_true",
+                        help="mode batch : retraite aussi les fichiers inchangés (ignore le manifeste)")
+    parser.add_argument("--spans", metavar="FICHIER",
+                        help="exporte en JSON les durées mesurées (count, p50, p95, max) en fin de session")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="affiche la durée de chaque phase du démarrage")
+    args = parser.parse_args()
+
+    global _STARTUP_PROFILE
+    _STARTUP_PROFILE = args.startup_profile
+    _startup_log("module", _T_START)
+
     print(f"PDF Header Tool version: {VERSION} (build {BUILD_ID})")
+    if args.batch:
+        code = run_batch(args.batch, args.config, args.workers, args.recursive, args.force)
+        _finish_spans(args.spans)
+        sys.exit(code)
+    if args.watch:
+        code = run_watch(args.watch, args.config, args.workers, args.recursive)
+        _finish_spans(args.spans)
+        sys.exit(code)
+
     check_update()
 
+    # Un seul dossier : scan en arrière-plan dans l'interface (sortie miroir)
+    scan_folder = None
+    if len(args.paths) == 1 and Path(args.paths[0]).is_dir():
+        scan_folder = Path(args.paths[0])
+
     pdf_files = []
-    if len(sys.argv) > 1:
-        for arg in sys.argv[1:]:
-            p = Path(arg)
-            if p.is_dir():
-                pdf_files.extend(sorted(p.glob("*.pdf")))
-            elif p.suffix.lower() == ".pdf" and p.exists():
-                pdf_files.append(p)
+    for arg in ([] if scan_folder else args.paths):
+        p = Path(arg)
+        if p.is_dir():
+            pdf_files.extend(sorted(p.glob("*.pdf")))
+        elif p.suffix.lower() == ".pdf" and p.exists():
+            pdf_files.append(p)
 
     if pdf_files:
         print(f"{len(pdf_files)} fichier(s) PDF trouvé(s).")
 
+    t0 = time.perf_counter()
+    _init_theme()
     root = ctk.CTk()
     root.geometry(f"{SIZES['win_w']}x{SIZES['win_h']}")
-    app = PDFHeaderApp(root, pdf_files)
+    _startup_log("window", t0)
+    app = PDFHeaderApp(root, pdf_files, scan_folder)
+    _startup_log("ready", _T_START)
     root.mainloop()
+    app.shutdown()
+    _finish_spans(args.spans)
 
 if __name__ == "__main__":
     main()